@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the Facebook export parsing hot paths.
+
+Generates a synthetic posts export (or uses an existing one) and reports
+throughput in sections per second for the timestamp parsers and for each
+section parser backend, checking that the backends produce the same output.
+
+Usage:
+    python benchmark_facebook_parsing.py [sections] [path/to/export.html]
+"""
+
+import sys
+import time
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+# Add src to path for imports
+sys.path.append(str(Path(__file__).parent / "src"))
+
+from src.steps.facebook_scraper import (
+    PARSER_BACKENDS,
+    etree,
+    _iter_section_markup,
+    _extract_post_data,
+    _extract_section_fields_soup,
+    _parse_facebook_timestamp
+)
+from src.utils import FacebookTimestampParser, ExportEntry
+
+
+PORTUGUESE_MONTHS = ["Jan", "Fev", "Mar", "Abr", "Mai", "Jun", "Jul", "Ago", "Set", "Out", "Nov", "Dez"]
+
+
+def legacy_parse_facebook_timestamp(timestamp_text: str) -> datetime:
+    """The replace-and-strptime parser used before the compiled parser, kept for comparison."""
+    timestamp_text = timestamp_text.replace(" da tarde", " PM")
+    timestamp_text = timestamp_text.replace(" da manhã", " AM")
+    timestamp_text = timestamp_text.replace(" da madrugada", " AM")
+
+    portuguese_months = {
+        "Jan": "Jan", "Fev": "Feb", "Mar": "Mar", "Abr": "Apr",
+        "Mai": "May", "Jun": "Jun", "Jul": "Jul", "Ago": "Aug",
+        "Set": "Sep", "Out": "Oct", "Nov": "Nov", "Dez": "Dec"
+    }
+    for pt_month, en_month in portuguese_months.items():
+        timestamp_text = timestamp_text.replace(pt_month, en_month)
+
+    for fmt in ("%b %d, %Y %I:%M:%S %p", "%d %b %Y %I:%M:%S %p", "%b %d, %Y %I:%M %p"):
+        try:
+            return datetime.strptime(timestamp_text, fmt)
+        except ValueError:
+            continue
+    return datetime.now()
+
+
+def generate_export(path: Path, sections: int):
+    """Write a synthetic posts export with Portuguese timestamps."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<html><head><title>Publicações</title></head><body><div role="main">')
+        for i in range(sections):
+            timestamp = f"{PORTUGUESE_MONTHS[i % 12]} {i % 28 + 1:02d}, 20{10 + i % 15} {i % 12 + 1}:{i // 7 % 60:02d}:{i % 60:02d} da {'tarde' if i % 2 else 'manhã'}"
+            f.write(
+                f'<section class="_a6-g"><h2 class="_a6-h">Nelson André atualizou o estado.</h2>'
+                # Bare ampersands ("Q&A") must survive every backend unchanged
+                f'<div class="_2ph_ _a6-p"><div>Publicação número {i} &amp; mais{" Q&A time" if i % 5 == 0 else ""}</div>'
+                f'<a href="https://example.com/{i}">https://example.com/{i}</a></div>'
+                f'<footer class="_a6-o"><div class="_a72d">{timestamp}</div></footer></section>'
+            )
+        f.write('</div></body></html>')
+
+
+def report(label: str, count: int, elapsed: float):
+    print(f"  {label:<40} {count / elapsed:>12,.0f} sections/s  ({elapsed:.2f}s)")
+
+
+def benchmark_timestamps(export_path: Path):
+    """Compare the legacy and compiled timestamp parsers on the export's timestamps."""
+    timestamps = []
+    for section_markup in _iter_section_markup(ExportEntry(str(export_path))):
+        timestamp = _extract_section_fields_soup(section_markup)["timestamp"]
+        if timestamp:
+            timestamps.append(timestamp)
+
+    print(f"Timestamp parsing ({len(timestamps)} timestamps):")
+
+    start = time.perf_counter()
+    for text in timestamps:
+        legacy_parse_facebook_timestamp(text)
+    report("legacy replace + strptime", len(timestamps), time.perf_counter() - start)
+
+    parser = FacebookTimestampParser(cache_size=0)
+    start = time.perf_counter()
+    for text in timestamps:
+        _parse_facebook_timestamp(text, parser)
+    report(f"compiled, no cache ({parser.layout}, {parser.locale})", len(timestamps), time.perf_counter() - start)
+
+    parser = FacebookTimestampParser()
+    start = time.perf_counter()
+    for text in timestamps:
+        _parse_facebook_timestamp(text, parser)
+    report("compiled + LRU cache", len(timestamps), time.perf_counter() - start)
+
+
+def benchmark_extraction(export_path: Path):
+    """Measure end-to-end section extraction throughput for each parser backend."""
+    print("Section extraction:")
+
+    outputs = {}
+    for backend in PARSER_BACKENDS:
+        if backend == "lxml" and etree is None:
+            print(f"  {backend:<40} not installed")
+            continue
+
+        parser = FacebookTimestampParser()
+        start = time.perf_counter()
+        articles = [
+            _extract_post_data(section_markup, "facebook_post", parser, backend)
+            for section_markup in _iter_section_markup(ExportEntry(str(export_path)))
+        ]
+        report(f"streaming + {backend}", len(articles), time.perf_counter() - start)
+        outputs[backend] = [
+            article.model_dump(exclude={'scraped_at'}) if article else None
+            for article in articles
+        ]
+
+    if len(outputs) > 1:
+        reference, *others = outputs.values()
+        mismatches = sum(1 for other in others for a, b in zip(reference, other) if a != b)
+        print(f"  Backend output mismatches: {mismatches}")
+
+
+def main():
+    sections = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if len(sys.argv) > 2:
+            export_path = Path(sys.argv[2])
+        else:
+            export_path = Path(tmp_dir) / "your_posts__check_ins__photos_and_videos_1.html"
+            generate_export(export_path, sections)
+
+        print(f"Facebook parsing benchmark: {export_path.name}")
+        print("=" * 60)
+        benchmark_timestamps(export_path)
+        benchmark_extraction(export_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 
 import os
 import sys
+import argparse
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -15,6 +16,19 @@ from src.utils import config
 def main():
     """Main entry point for the publications scraping pipeline."""
     
+    parser = argparse.ArgumentParser(description="Publications & Social Media Scraping Pipeline")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-process Facebook/X export files and Medium feed items even if they were already ingested unchanged"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Report how many new items the run would store, without writing anything"
+    )
+    args = parser.parse_args()
+    
     # Load environment variables
     load_dotenv()
     
@@ -32,7 +46,7 @@ def main():
     x_data_path = config.x_data_path
     
     # Interactive configuration if Medium username not set
-    if include_medium and not medium_username:
+    if include_medium and not medium_username and not config.medium_feeds:
         print("\nMedium Configuration:")
         medium_username = input("Enter your Medium username (without @) or press Enter to skip: ").strip()
         include_medium = bool(medium_username)
@@ -65,14 +79,27 @@ def main():
     print(f"  Facebook data: {'✓ Enabled' if include_facebook else '✗ Disabled'}")
     if include_facebook:
         print(f"    Path: {facebook_data_path}")
+        print(f"    Workers: {config.facebook_workers or 'all cores'}")
+        print(f"    Activities: {', '.join(config.facebook_activities)}")
+        print(f"    Parser: {config.facebook_parser_backend}")
     print(f"  Medium articles: {'✓ Enabled' if include_medium else '✗ Disabled'}")
     if include_medium:
-        print(f"    Username: @{medium_username}")
+        if medium_username:
+            print(f"    Username: @{medium_username}")
+        if config.medium_feeds:
+            print(f"    Feeds: {', '.join(config.medium_feeds)}")
+        print(f"    Concurrency: {config.medium_concurrency}")
+        print(f"    Full articles: {'✓ Enabled' if config.medium_full_articles else '✗ Disabled'}")
     print(f"  NP Blog articles: ✗ Disabled (scraping disabled)")
     print(f"  X tweets: {'✓ Enabled' if include_x else '✗ Disabled'}")
     if include_x:
         print(f"    Path: {x_data_path}")
+        print(f"    Workers: {config.x_workers or 'all cores'}")
     print(f"  Max items per platform: {config.max_articles_per_platform}")
+    if args.force:
+        print("  Export manifest / feed cache: ✗ Ignored (--force)")
+    if args.dry_run:
+        print("  Dry run: ✓ Nothing is written to MongoDB, the export manifest or the feed cache")
     print("-" * 60)
     
     try:
@@ -86,7 +113,18 @@ def main():
             include_medium=include_medium,
             include_facebook=include_facebook,
             include_npblog=include_npblog,
-            include_x=include_x
+            include_x=include_x,
+            facebook_workers=config.facebook_workers,
+            force_reprocess=args.force,
+            facebook_activities=config.facebook_activities,
+            facebook_parser_backend=config.facebook_parser_backend,
+            x_workers=config.x_workers,
+            medium_feeds=config.medium_feeds,
+            medium_concurrency=config.medium_concurrency,
+            medium_full_articles=config.medium_full_articles,
+            medium_retries=config.medium_retries,
+            medium_base_url=config.medium_base_url,
+            dry_run=args.dry_run
         )
         
         print("\n" + "=" * 60)
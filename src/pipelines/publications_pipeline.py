@@ -1,7 +1,9 @@
+import uuid
 from zenml import pipeline, step, get_step_context
-from typing import List, Tuple
+from typing import List, Tuple, Optional
 from src.steps import (
     scrape_medium_articles,
+    fetch_medium_full_articles,
     scrape_facebook_data,
     scrape_npblog_articles,
     scrape_x_tweets,
@@ -44,6 +46,8 @@ def print_summary(
     print(f"Articles updated: {storage_stats['updated_articles']}")
     print(f"Duplicate articles skipped: {storage_stats['duplicate_articles']}")
     print(f"Errors encountered: {storage_stats['errors']}")
+    if storage_stats.get('dry_run'):
+        print(f"Dry run: {storage_stats['new_articles']} new articles would be stored (nothing was written)")
     
     print("\nCurrent database statistics:")
     print(f"  {medium_count['platform']}: {medium_count['count']} articles")
@@ -106,7 +110,18 @@ def publications_pipeline(
     include_medium: bool = True,
     include_facebook: bool = True,
     include_npblog: bool = True,
-    include_x: bool = True
+    include_x: bool = True,
+    facebook_workers: int = 1,
+    force_reprocess: bool = False,
+    facebook_activities: Optional[List[str]] = None,
+    facebook_parser_backend: str = "html.parser",
+    x_workers: int = 1,
+    medium_feeds: Optional[List[str]] = None,
+    medium_concurrency: int = 4,
+    medium_full_articles: bool = False,
+    medium_retries: int = 3,
+    medium_base_url: str = "https://medium.com",
+    dry_run: bool = False
 ):
     """
     Main pipeline to scrape Medium publications, Facebook activity data, NP Blog articles, and X tweets, then store in MongoDB.
@@ -115,40 +130,88 @@ def publications_pipeline(
         medium_username: Medium username (without @). If None and include_medium is True, will skip Medium
         facebook_data_path: Path to Facebook data export directory
         npblog_url: URL to NP Blog to scrape
-        x_data_path: Path to X data directory containing tweets.js
+        x_data_path: Path to X data directory containing tweets.js (and any tweets-partN.js)
         max_articles_per_platform: Maximum articles to scrape from each platform
         include_medium: Whether to include Medium scraping
         include_facebook: Whether to include Facebook data processing
         include_npblog: Whether to include NP Blog scraping
         include_x: Whether to include X tweets processing
+        facebook_workers: Number of processes used to parse Facebook export files
+        force_reprocess: Re-process export files already recorded in the export manifest and ignore the Medium feed cache
+        facebook_activities: Facebook activity types to extract (defaults to posts only)
+        facebook_parser_backend: HTML backend for Facebook sections ("html.parser" or "lxml")
+        x_workers: Number of processes used to decode X tweet archive parts
+        medium_feeds: Additional Medium feeds ("@username" or publication name)
+        medium_concurrency: Maximum number of Medium feeds (and full posts) fetched at the same time
+        medium_full_articles: Fetch full Medium post bodies and backfill the authors' archives
+        medium_retries: Retries per Medium request in the full-article stage
+        medium_base_url: Medium origin (overridable to point at a local stand-in)
+        dry_run: Count the new items a run would store without writing to MongoDB,
+            the export manifest or the feed cache
     """
     
+    # Scrapers stage their export manifest and feed cache updates under this
+    # id, and the storage step commits them once the articles are stored
+    run_id = uuid.uuid4().hex
+    
     medium_articles = []
     facebook_articles = []
     npblog_articles = []
     x_articles = []
     
-    # Scrape articles from Medium if requested and username provided
-    if include_medium and medium_username and medium_username.strip():
+    # Scrape articles from Medium if requested and a username or feed provided
+    has_medium_sources = bool(medium_username and medium_username.strip()) or bool(medium_feeds)
+    if include_medium and has_medium_sources:
         medium_articles = scrape_medium_articles(
             username=medium_username,
-            max_articles=max_articles_per_platform
+            max_articles=max_articles_per_platform,
+            force=force_reprocess,
+            feeds=medium_feeds,
+            concurrency=medium_concurrency,
+            base_url=medium_base_url,
+            dry_run=dry_run,
+            run_id=run_id
         )
-    elif include_medium and (not medium_username or not medium_username.strip()):
-        print("Medium scraping requested but no username provided. Skipping Medium.")
+        if medium_full_articles:
+            medium_usernames = [medium_username.strip()] if medium_username and medium_username.strip() else []
+            medium_usernames += [feed.strip()[1:] for feed in medium_feeds or [] if feed.strip().startswith('@')]
+            medium_articles = fetch_medium_full_articles(
+                medium_articles,
+                usernames=medium_usernames,
+                max_articles=max_articles_per_platform,
+                concurrency=medium_concurrency,
+                retries=medium_retries,
+                base_url=medium_base_url,
+                connection_string=config.mongo_connection_string,
+                database_name=config.mongo_database,
+                collection_name=config.mongo_collection
+            )
+    elif include_medium:
+        print("Medium scraping requested but no username or feeds provided. Skipping Medium.")
     
     # Process Facebook data if requested
     if include_facebook:
         facebook_articles = scrape_facebook_data(
             facebook_data_path=facebook_data_path,
-            max_items=max_articles_per_platform
+            max_items=max_articles_per_platform,
+            workers=facebook_workers,
+            # Dry runs read the same files as a normal run; the manifest and
+            # checkpoint updates they stage are discarded by the storage step
+            force=force_reprocess,
+            activities=facebook_activities,
+            parser_backend=facebook_parser_backend,
+            run_id=run_id
         )
     
     # Scrape NP Blog articles if requested (DISABLED)
     if include_npblog:
         # npblog_articles = scrape_npblog_articles(
         #     base_url=npblog_url,
-        #     max_articles=max_articles_per_platform
+        #     max_articles=max_articles_per_platform,
+        #     concurrency=config.npblog_concurrency,
+        #     force=force_reprocess,
+        #     dry_run=dry_run,
+        #     run_id=run_id
         # )
         npblog_articles = []  # Disabled npblog scraping
     
@@ -156,7 +219,13 @@ def publications_pipeline(
     if include_x:
         x_articles = scrape_x_tweets(
             x_data_path=x_data_path,
-            max_tweets=max_articles_per_platform
+            max_tweets=max_articles_per_platform,
+            force=force_reprocess,
+            workers=x_workers,
+            run_id=run_id,
+            connection_string=config.mongo_connection_string,
+            database_name=config.mongo_database,
+            collection_name=config.mongo_collection
         )
     
     # Combine all articles
@@ -167,7 +236,12 @@ def publications_pipeline(
         all_articles,
         connection_string=config.mongo_connection_string,
         database_name=config.mongo_database,
-        collection_name=config.mongo_collection
+        collection_name=config.mongo_collection,
+        batch_size=config.mongo_batch_size,
+        use_url_index=config.url_index_enabled,
+        rebuild_url_index=force_reprocess,
+        dry_run=dry_run,
+        run_id=run_id
     )
     
     # Get updated counts for each platform (after storage)
@@ -1,4 +1,4 @@
-from .medium_scraper import scrape_medium_articles
+from .medium_scraper import scrape_medium_articles, fetch_medium_full_articles
 from .mongodb_storage import store_articles_in_mongodb, get_stored_articles_count
 from .facebook_scraper import scrape_facebook_data
 from .npblog_scraper import scrape_npblog_articles
@@ -6,6 +6,7 @@ from .x_scraper import scrape_x_tweets
 
 __all__ = [
     "scrape_medium_articles", 
+    "fetch_medium_full_articles",
     "store_articles_in_mongodb",
     "get_stored_articles_count",
     "scrape_facebook_data",
@@ -1,27 +1,191 @@
 from zenml import step
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+import io
 import os
 import re
+import html
+import codecs
 import hashlib
-from pathlib import Path
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from fnmatch import fnmatch
+from itertools import islice
+from pathlib import Path, PurePosixPath
 from bs4 import BeautifulSoup
 from datetime import datetime
 import logging
 from src.models import Article
 
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:  # lxml is optional; the html.parser backend is always available
+    etree = None
+from src.utils.facebook_timestamps import FacebookTimestampParser
+from src.utils.export_archive import ExportFS, ExportEntry
+from src.utils.export_manifest import ExportManifest
+from src.utils.section_index import INDEX_SUFFIX, SectionIndex
+from src.utils.json_stream import iter_json_array
+
 logger = logging.getLogger(__name__)
 
+# Class Facebook uses for each activity entry in its HTML exports
+SECTION_CLASS = "_a6-g"
+
+# Shared parser for callers that do not track a per-file one
+_default_timestamp_parser = FacebookTimestampParser()
+
+# Keys whose string values hold an entry's text and links in JSON exports
+JSON_TEXT_KEYS = ("post", "comment", "description", "text")
+JSON_LINK_KEYS = ("url", "uri")
+
+# Backends that can extract fields from a section's markup
+PARSER_BACKENDS = ("html.parser", "lxml")
+
+if etree is not None:
+    # Every element _extract_section_fields_lxml looks at, in document order
+    _SECTION_FIELDS_XPATH = etree.XPath(
+        './/h2 | .//footer | .//a'
+        ' | .//div[contains(concat(" ", normalize-space(@class), " "), " _a6-p ")'
+        ' or contains(concat(" ", normalize-space(@class), " "), " _a72d ")]'
+    )
+    # Text nodes BeautifulSoup's get_text() would include (no script/style bodies)
+    _VISIBLE_TEXT_XPATH = etree.XPath('.//text()[not(parent::script or parent::style)]')
+
+# Bytes read from an export file per tokenizer feed
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Files at least this large get a section offset index, so they can be split
+# across workers and resumed from a checkpoint
+SECTION_INDEX_MIN_BYTES = 8 * 1024 * 1024
+
+# Work units submitted to the process pool ahead of the one being merged, per
+# worker; keeps memory flat when an export has thousands of small files
+UNITS_IN_FLIGHT_PER_WORKER = 4
+
+# Bytes read from the start of a Messenger thread file to find its title
+THREAD_TITLE_READ_BYTES = 64 * 1024
+
+# Activity types that can be extracted from an export. Each entry lists the
+# files it is read from (glob patterns relative to the export root, numbered
+# files sorted numerically) and how they are turned into articles: "sections"
+# files hold one item per section._a6-g, "thread" files are Messenger threads
+# with one message per div._a6-g, "document" files become a single item.
+# For "sections" and "thread" activities a JSON export of the same name
+# (x.json for x.html) is preferred when present; json_key names the array
+# holding its items when it is not the first one in the file.
+ACTIVITY_REGISTRY = {
+    "posts": {
+        "content_type": "facebook_post",
+        "extractor": "sections",
+        "patterns": [
+            "your_facebook_activity/posts/your_posts__check_ins__photos_and_videos_*.html",
+            "your_facebook_activity/posts/posts_on_other_pages_and_profiles.html",
+            "your_facebook_activity/posts/your_photos.html",
+            "your_facebook_activity/posts/your_videos.html",
+            "your_facebook_activity/posts/archive.html",
+            "your_facebook_activity/posts/your_uncategorized_photos.html",
+            "your_facebook_activity/posts/birthday_media.html",
+            "your_facebook_activity/posts/media_used_for_memories.html",
+            "your_facebook_activity/posts/places_you_have_been_tagged_in.html",
+            "your_facebook_activity/posts/edits_you_made_to_posts.html",
+            "your_facebook_activity/posts/content_sharing_links_you_have_created.html",
+            "your_facebook_activity/posts/album/*.html"
+        ]
+    },
+    "comments": {
+        "content_type": "facebook_comment",
+        "extractor": "sections",
+        "patterns": [
+            "your_facebook_activity/comments_and_reactions/comments.html",
+            "your_facebook_activity/comments_and_reactions/comments_*.html"
+        ],
+        "json_key": "comments_v2"
+    },
+    "reactions": {
+        "content_type": "facebook_reaction",
+        "extractor": "sections",
+        "patterns": [
+            "your_facebook_activity/comments_and_reactions/likes_and_reactions.html",
+            "your_facebook_activity/comments_and_reactions/likes_and_reactions_*.html"
+        ]
+    },
+    "messages": {
+        "content_type": "facebook_message",
+        "extractor": "sections",
+        "patterns": [
+            "your_facebook_activity/messages/your_messages.html"
+        ]
+    },
+    "inbox": {
+        "content_type": "facebook_message",
+        "extractor": "thread",
+        "patterns": [
+            "your_facebook_activity/messages/inbox/*/message_*.html",
+            "your_facebook_activity/messages/e2ee_cutover/*/message_*.html",
+            "your_facebook_activity/messages/archived_threads/*/message_*.html",
+            "your_facebook_activity/messages/filtered_threads/*/message_*.html"
+        ],
+        "json_key": "messages"
+    },
+    "ads": {
+        "content_type": "facebook_ads_info",
+        "extractor": "sections",
+        "patterns": [
+            "ads_information/ad_preferences.html",
+            "ads_information/advertisers_using_your_activity_or_information.html",
+            "ads_information/advertisers_you've_interacted_with.html"
+        ]
+    },
+    "security": {
+        "content_type": "facebook_security_info",
+        "extractor": "sections",
+        "patterns": [
+            "security_and_login_information/account_activity.html",
+            "security_and_login_information/logins_and_logouts.html",
+            "security_and_login_information/ip_address_activity.html"
+        ]
+    },
+    "root": {
+        "content_type": "root_activity",
+        "extractor": "document",
+        "patterns": [
+            "start_here.html"
+        ]
+    }
+}
+
 @step
 def scrape_facebook_data(
     facebook_data_path: str = "/home/na/DEV/twin/data/Facebook",
-    max_items: int = 100
+    max_items: int = 100,
+    workers: int = 1,
+    force: bool = False,
+    activities: Optional[List[str]] = None,
+    parser_backend: str = "html.parser",
+    run_id: str = ""
 ) -> List[Article]:
     """
     Scrapes Facebook activity data from HTML export files.
     
+    The export tree is walked once and every file is parsed once, with its
+    sections sent to the extractor of the activity type it belongs to.
+    
     Args:
-        facebook_data_path: Path to Facebook data directory
+        facebook_data_path: Path to Facebook data directory, a downloaded
+            export .zip, or a directory holding the export's zip parts
         max_items: Maximum number of items to process
+        workers: Number of processes used to parse export files concurrently
+            (1 parses serially, 0 or less uses every available core)
+        force: Re-process files even if the export manifest says they were
+            already ingested unchanged
+        activities: Activity types to extract, from ACTIVITY_REGISTRY
+            (defaults to posts only)
+        parser_backend: HTML backend used to extract section fields,
+            "html.parser" (BeautifulSoup) or "lxml" (faster, needs lxml)
+        run_id: Pipeline run whose storage step commits the export manifest
+            updates; without one they are saved right away
     
     Returns:
         List of Article objects containing Facebook data
@@ -34,28 +198,27 @@ def scrape_facebook_data(
             logger.warning(f"Facebook data path does not exist: {facebook_data_path}")
             return articles
 
-        # Process different types of Facebook activity
-        activity_processors = {
-            "posts": _process_posts
-        }
+        activities = activities or ["posts"]
+        unknown = [activity for activity in activities if activity not in ACTIVITY_REGISTRY]
+        if unknown:
+            logger.warning(f"Ignoring unknown Facebook activity types: {', '.join(unknown)}")
+        activities = [activity for activity in activities if activity in ACTIVITY_REGISTRY]
 
-        processed_count = 0
-        
-        for activity_type, processor in activity_processors.items():
-            if processed_count >= max_items:
-                break
-                
-            activity_path = facebook_path / "your_facebook_activity" / activity_type
-            if activity_path.exists():
-                try:
-                    items = processor(activity_path, max_items - processed_count)
-                    articles.extend(items)
-                    processed_count += len(items)
-                    logger.info(f"Processed {len(items)} items from {activity_type}")
-                except Exception as e:
-                    logger.error(f"Error processing {activity_type}: {str(e)}")
-
-        # Skip root level activity files since we only want posts
+        if parser_backend not in PARSER_BACKENDS:
+            logger.warning(f"Unknown parser backend '{parser_backend}', using html.parser")
+            parser_backend = "html.parser"
+        elif parser_backend == "lxml" and etree is None:
+            logger.warning("lxml is not installed, using html.parser")
+            parser_backend = "html.parser"
+
+        # Files that were fully ingested on a previous run are skipped unless forced
+        manifest = None if force else ExportManifest()
+
+        export_files = _discover_activity_files(ExportFS(facebook_path), activities)
+        articles = _process_export_files(export_files, max_items, workers, manifest, parser_backend)
+
+        if manifest:
+            manifest.save(run_id)
 
         logger.info(f"Successfully scraped {len(articles)} Facebook activity items")
         
@@ -65,327 +228,743 @@ def scrape_facebook_data(
     return articles[:max_items]
 
 
-def _process_posts(posts_path: Path, max_items: int) -> List[Article]:
-    """Process Facebook posts data"""
-    articles = []
+def _discover_activity_files(export_fs: ExportFS, activities: List[str]) -> List[Tuple[ExportEntry, str]]:
+    """
+    Walk the export tree once and match files against the enabled activities.
     
-    try:
-        # List of post files to process
-        post_files = [
-            "your_posts__check_ins__photos_and_videos_1.html",
-            "posts_on_other_pages_and_profiles.html", 
-            "your_photos.html",
-            "your_videos.html",
-            "archive.html",
-            "your_uncategorized_photos.html",
-            "birthday_media.html",
-            "media_used_for_memories.html",
-            "places_you_have_been_tagged_in.html",
-            "edits_you_made_to_posts.html",
-            "content_sharing_links_you_have_created.html",
-            "album/0.html"
-        ]
-        
-        for post_file_name in post_files:
-            if len(articles) >= max_items:
+    Returns (entry, activity) pairs in registry order, with numbered files
+    (e.g. album/0.html ... album/N.html) sorted numerically. HTML files with
+    a JSON counterpart are replaced by it. Directories no pattern can match
+    are not descended into.
+    """
+    patterns = []
+    for activity in activities:
+        spec = ACTIVITY_REGISTRY[activity]
+        for pattern in spec["patterns"]:
+            patterns.append((pattern, activity))
+            if spec["extractor"] in ("sections", "thread") and pattern.endswith('.html'):
+                patterns.append((pattern[:-len('.html')] + '.json', activity))
+    pattern_dirs = [pattern.split('/')[:-1] for pattern, _ in patterns]
+    matches = {pattern: [] for pattern, _ in patterns}
+    
+    def include_dir(dir_parts: tuple) -> bool:
+        return any(_could_contain(dir_parts, parts) for parts in pattern_dirs)
+    
+    for rel_path, entry in export_fs.iter_files(include_dir):
+        # Section index sidecars would otherwise match the JSON patterns
+        if rel_path.endswith(INDEX_SUFFIX):
+            continue
+        for pattern, _ in patterns:
+            # Compare component-wise so '*' never crosses a directory
+            if _path_matches(rel_path, pattern):
+                matches[pattern].append((rel_path, entry))
                 break
-                
-            posts_file = posts_path / post_file_name
-            if posts_file.exists():
-                try:
-                    with open(posts_file, 'r', encoding='utf-8') as f:
-                        soup = BeautifulSoup(f.read(), 'html.parser')
-                        
-                        # Extract post sections
-                        sections = soup.find_all('section', class_='_a6-g')
-                        remaining_items = max_items - len(articles)
-                        
-                        for section in sections[:remaining_items]:
-                            article = _extract_post_data(section, "facebook_post")
-                            if article:
-                                articles.append(article)
-                        
-                        if len(sections) > 0:
-                            logger.info(f"Processed {min(len(sections), remaining_items)} posts from {post_file_name}")
-                            
-                except Exception as e:
-                    logger.error(f"Error processing {post_file_name}: {str(e)}")
-                        
-    except Exception as e:
-        logger.error(f"Error processing posts: {str(e)}")
     
-    return articles
+    json_files = {rel_path for pattern, _ in patterns if pattern.endswith('.json') for rel_path, _ in matches[pattern]}
+    
+    export_files = []
+    for pattern, activity in patterns:
+        for rel_path, entry in sorted(matches[pattern], key=lambda match: _natural_sort_key(match[0])):
+            if rel_path.endswith('.html') and rel_path[:-len('.html')] + '.json' in json_files:
+                continue
+            export_files.append((entry, activity))
+    
+    return export_files
+
 
+def _could_contain(dir_parts: tuple, pattern_dir_parts: list) -> bool:
+    """Check whether a directory is (a parent of) a directory a pattern can match"""
+    return len(dir_parts) <= len(pattern_dir_parts) and all(
+        fnmatch(part, pattern) for part, pattern in zip(dir_parts, pattern_dir_parts)
+    )
 
-def _process_comments(comments_path: Path, max_items: int) -> List[Article]:
-    """Process Facebook comments and reactions data"""
+
+def _path_matches(rel_path: str, pattern: str) -> bool:
+    path_parts = rel_path.split('/')
+    pattern_parts = pattern.split('/')
+    return len(path_parts) == len(pattern_parts) and all(
+        fnmatch(part, pattern) for part, pattern in zip(path_parts, pattern_parts)
+    )
+
+
+def _natural_sort_key(rel_path: str) -> list:
+    """
+    Sort key on an export-relative path that orders album/2.html before
+    album/10.html, and files of different folders by folder first
+    """
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', rel_path)]
+
+
+def _process_export_files(
+    export_files: List[Tuple[ExportEntry, str]],
+    max_items: int,
+    workers: int = 1,
+    manifest: Optional[ExportManifest] = None,
+    backend: str = "html.parser"
+) -> List[Article]:
+    """
+    Parse (entry, activity) export files, serially or across a process pool.
+    
+    Files are split into work units: small files and archive members are one
+    unit each, while files on disk of SECTION_INDEX_MIN_BYTES or more are
+    indexed, split into byte ranges on section boundaries and resumed from
+    their checkpoint in the manifest. Units are
+    merged in order, so the output is the same for any number of workers.
+    Without a manifest (forced runs) every file is read from the start and
+    checkpoints are neither read nor written, so a forced run never moves
+    where the next regular run resumes.
+    """
     articles = []
+    activity_counts = {}
     
-    try:
-        # Process comments file
-        comments_file = comments_path / "comments.html"
-        if comments_file.exists():
-            with open(comments_file, 'r', encoding='utf-8') as f:
-                soup = BeautifulSoup(f.read(), 'html.parser')
-                
-                sections = soup.find_all('section', class_='_a6-g')
-                for section in sections[:max_items]:
-                    article = _extract_post_data(section, "facebook_comment")
-                    if article:
-                        articles.append(article)
-
-        # Process reactions file if exists
-        reactions_file = comments_path / "likes_and_reactions.html"
-        if reactions_file.exists() and len(articles) < max_items:
-            remaining = max_items - len(articles)
-            with open(reactions_file, 'r', encoding='utf-8') as f:
-                soup = BeautifulSoup(f.read(), 'html.parser')
-                
-                sections = soup.find_all('section', class_='_a6-g')
-                for section in sections[:remaining]:
-                    article = _extract_post_data(section, "facebook_reaction")
-                    if article:
-                        articles.append(article)
-                        
-    except Exception as e:
-        logger.error(f"Error processing comments: {str(e)}")
+    if manifest:
+        unchanged = {path for path, _ in export_files if manifest.is_unchanged(path)}
+        if unchanged:
+            logger.info(f"Skipping {len(unchanged)} export files already ingested")
+        export_files = [(path, activity) for path, activity in export_files if path not in unchanged]
+    
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    
+    plans = []
+    units = []
+    unit_plans = []
+    for export_file, activity in export_files:
+        activity_counts.setdefault(activity, 0)
+        plan = {
+            "path": export_file,
+            "activity": activity,
+            "index": None,
+            "first_section": 0,
+            "consumed": 0,
+            "units": 0,
+            "units_done": 0,
+            "complete": True
+        }
+        ranges = [(0, None)]
+        
+        # Archive members cannot be memory-mapped, so only files on disk are indexed
+        is_sectioned = ACTIVITY_REGISTRY[activity]["extractor"] == "sections" and export_file.suffix == '.html'
+        if is_sectioned and export_file.member is None and export_file.stat()[0] >= SECTION_INDEX_MIN_BYTES:
+            index = SectionIndex.load(Path(export_file.path))
+            if manifest:
+                plan["first_section"] = index.section_at(manifest.checkpoint(export_file))
+            plan["index"] = index
+            ranges = index.split(workers, plan["first_section"])
+            logger.info(
+                f"{export_file.name}: {index.count} sections, "
+                f"{index.count - plan['first_section']} to process in {len(ranges)} ranges"
+            )
+        
+        for start, end in ranges:
+            units.append((export_file, activity, start, end))
+            unit_plans.append(plan)
+        plan["units"] = len(ranges)
+        plans.append(plan)
+    
+    for unit_number, (results, complete) in enumerate(_run_export_units(units, max_items, workers, backend)):
+        plan = unit_plans[unit_number]
+        plan["units_done"] += 1
+        
+        for article in results:
+            if len(articles) >= max_items:
+                complete = False
+                break
+            # The checkpoint only advances over an unbroken run of sections
+            if plan["complete"]:
+                plan["consumed"] += 1
+            if article:
+                articles.append(article)
+                activity_counts[plan["activity"]] += 1
+        
+        if not complete:
+            plan["complete"] = False
+    
+    for plan in plans:
+        index = plan["index"]
+        if not manifest:
+            continue
+        if plan["complete"] and plan["units_done"] == plan["units"]:
+            manifest.record(plan["path"])
+        elif index:
+            manifest.record_checkpoint(plan["path"], index.offset_of(plan["first_section"] + plan["consumed"]))
+            logger.info(f"Checkpointed {plan['path'].name} at section {plan['first_section'] + plan['consumed']}")
+    
+    for activity, count in activity_counts.items():
+        logger.info(f"Processed {count} items from {activity}")
     
     return articles
 
 
-def _process_messages(messages_path: Path, max_items: int) -> List[Article]:
-    """Process Facebook messages data"""
-    articles = []
+def _run_export_units(
+    units: List[tuple],
+    max_items: int,
+    workers: int,
+    backend: str = "html.parser"
+) -> Iterator[Tuple[List[Optional[Article]], bool]]:
+    """
+    Yield the results of each work unit in order, stopping once max_items
+    articles have been produced.
     
-    try:
-        # Process main messages file
-        messages_file = messages_path / "your_messages.html"
-        if messages_file.exists():
-            with open(messages_file, 'r', encoding='utf-8') as f:
-                soup = BeautifulSoup(f.read(), 'html.parser')
-                
-                sections = soup.find_all('section', class_='_a6-g')
-                for section in sections[:max_items]:
-                    article = _extract_post_data(section, "facebook_message")
-                    if article:
-                        articles.append(article)
-                        
-    except Exception as e:
-        logger.error(f"Error processing messages: {str(e)}")
+    With several workers, units are fed to the pool through a bounded window
+    of UNITS_IN_FLIGHT_PER_WORKER per worker, so only a few batches of results
+    wait in memory however many files the export has.
+    """
+    produced = 0
     
-    return articles
+    if workers == 1 or len(units) <= 1:
+        for file_path, activity, start, end in units:
+            if produced >= max_items:
+                return
+            results, complete = _parse_export_range(file_path, activity, start, end, max_items - produced, backend)
+            produced += sum(1 for article in results if article)
+            yield results, complete
+        return
+    
+    # Every unit is capped at max_items on its own; no further units are
+    # submitted and pending ones are cancelled once enough articles are merged
+    workers = min(workers, len(units))
+    pending_units = iter(units)
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = deque(
+            executor.submit(_parse_export_range, *unit, max_items, backend)
+            for unit in islice(pending_units, workers * UNITS_IN_FLIGHT_PER_WORKER)
+        )
+        
+        while futures:
+            future = futures.popleft()
+            if produced >= max_items:
+                future.cancel()
+                continue
+            results, complete = future.result()
+            produced += sum(1 for article in results if article)
+            
+            unit = next(pending_units, None)
+            if unit is not None and produced < max_items:
+                futures.append(executor.submit(_parse_export_range, *unit, max_items, backend))
+            
+            yield results, complete
 
 
-def _process_ads_info(ads_path: Path, max_items: int) -> List[Article]:
-    """Process Facebook ads information"""
-    articles = []
+def _parse_export_range(
+    export_file: ExportEntry,
+    activity: str,
+    start: int,
+    end: Optional[int],
+    max_items: int,
+    backend: str = "html.parser"
+) -> Tuple[List[Optional[Article]], bool]:
+    """
+    Parse up to max_items sections of one export file, optionally limited to
+    the byte range [start, end), with the extractor of its activity type and
+    the given parser backend.
+    
+    Runs in worker processes, so it takes and returns picklable values only.
+    Returns one entry per section read (None where extraction failed) and
+    whether the whole range was read without errors.
+    """
+    results = []
+    complete = False
+    file_name = export_file.name
+    spec = ACTIVITY_REGISTRY[activity]
+    content_type = spec["content_type"]
     
     try:
-        ads_files = [
-            "ad_preferences.html",
-            "advertisers_using_your_activity_or_information.html",
-            "advertisers_you've_interacted_with.html"
-        ]
+        if spec["extractor"] == "document":
+            return [_extract_document_data(export_file, content_type)], True
         
-        processed_count = 0
-        for ads_file in ads_files:
-            if processed_count >= max_items:
-                break
-                
-            file_path = ads_path / ads_file
-            if file_path.exists():
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    soup = BeautifulSoup(f.read(), 'html.parser')
-                    
-                    sections = soup.find_all('section', class_='_a6-g')
-                    remaining = max_items - processed_count
-                    for section in sections[:remaining]:
-                        article = _extract_post_data(section, "facebook_ads_info")
-                        if article:
-                            articles.append(article)
-                            processed_count += 1
-                            
+        if export_file.suffix == '.json':
+            with export_file.open() as raw:
+                items = iter_json_array(io.TextIOWrapper(raw, encoding='utf-8'), spec.get("json_key"))
+                for item in islice(items, max_items):
+                    if spec["extractor"] == "thread":
+                        results.append(_extract_json_message(item, export_file, content_type))
+                    else:
+                        results.append(_extract_json_item(item, content_type))
+                complete = next(items, None) is None
+            
+            if results:
+                logger.info(f"Processed {len(results)} items from {file_name}")
+            return results, complete
+        
+        # Stream sections so reading stops as soon as the limit is hit; the
+        # timestamp format is detected once and reused for the whole range
+        timestamp_parser = FacebookTimestampParser()
+        
+        if spec["extractor"] == "thread":
+            # A thread's messages come back to the parent as one batch
+            thread_title = _read_thread_title(export_file)
+            sections = _iter_section_markup(export_file, start=start, end=end, tag='div')
+            for section_markup in islice(sections, max_items):
+                results.append(_extract_message_data(
+                    section_markup, export_file, thread_title, content_type, timestamp_parser, backend
+                ))
+        else:
+            sections = _iter_section_markup(export_file, start=start, end=end)
+            for section_markup in islice(sections, max_items):
+                results.append(_extract_post_data(section_markup, content_type, timestamp_parser, backend))
+        
+        complete = next(sections, None) is None
+        sections.close()
+        
+        if results:
+            logger.info(f"Processed {len(results)} sections from {file_name}")
+            
     except Exception as e:
-        logger.error(f"Error processing ads info: {str(e)}")
+        logger.error(f"Error processing {file_name}: {str(e)}")
     
-    return articles
+    return results, complete
 
 
-def _process_security_info(security_path: Path, max_items: int) -> List[Article]:
-    """Process Facebook security and login information"""
-    articles = []
+class _SectionCollector(HTMLParser):
+    """Incremental tokenizer that captures the markup of each activity section.
+
+    Only the section currently being read is buffered, so memory stays flat
+    regardless of the size of the export file. Sections are `<section>`
+    elements by default; Messenger threads use `<div>` for each message.
+    """
+
+    def __init__(self, tag: str = 'section'):
+        # References are decoded by the tokenizer and re-escaped in handle_data,
+        # so bare ampersands ("Q&A") reach every backend as valid markup
+        super().__init__(convert_charrefs=True)
+        self.completed = deque()
+        self._tag = tag
+        self._parts = []
+        self._depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if self._depth:
+            self._parts.append(self.get_starttag_text())
+            if tag == self._tag:
+                self._depth += 1
+        elif tag == self._tag and SECTION_CLASS in (dict(attrs).get('class') or '').split():
+            self._parts = [self.get_starttag_text()]
+            self._depth = 1
+
+    def handle_startendtag(self, tag, attrs):
+        if self._depth:
+            self._parts.append(self.get_starttag_text())
+
+    def handle_endtag(self, tag):
+        if not self._depth:
+            return
+        self._parts.append(f"</{tag}>")
+        if tag == self._tag:
+            self._depth -= 1
+            if not self._depth:
+                self.completed.append(''.join(self._parts))
+                self._parts = []
+
+    def handle_data(self, data):
+        if self._depth:
+            self._parts.append(html.escape(data, quote=False))
+
+
+def _iter_section_markup(
+    export_file: ExportEntry,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    start: int = 0,
+    end: Optional[int] = None,
+    tag: str = 'section'
+) -> Iterator[str]:
+    """
+    Yield the markup of each `section._a6-g` (or `<tag>._a6-g`) in an export
+    file, one at a time.
     
-    try:
-        security_files = [
-            "account_activity.html",
-            "logins_and_logouts.html",
-            "ip_address_activity.html"
-        ]
-        
-        processed_count = 0
-        for security_file in security_files:
-            if processed_count >= max_items:
-                break
-                
-            file_path = security_path / security_file
-            if file_path.exists():
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    soup = BeautifulSoup(f.read(), 'html.parser')
-                    
-                    sections = soup.find_all('section', class_='_a6-g')
-                    remaining = max_items - processed_count
-                    for section in sections[:remaining]:
-                        article = _extract_post_data(section, "facebook_security_info")
-                        if article:
-                            articles.append(article)
-                            processed_count += 1
-                            
-    except Exception as e:
-        logger.error(f"Error processing security info: {str(e)}")
+    The file is fed to the tokenizer in chunks, so callers that stop iterating
+    early never read the rest of the file. start and end limit reading to a
+    byte range, which must begin on a section boundary.
+    """
+    collector = _SectionCollector(tag)
+    # Decode like a text-mode open() would, including newline translation
+    decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder('utf-8')(), translate=True)
+    remaining = None if end is None else end - start
     
-    return articles
+    with export_file.open() as f:
+        if start:
+            f.seek(start)
+        while True:
+            size = chunk_size if remaining is None else min(chunk_size, remaining)
+            data = f.read(size) if size > 0 else b''
+            if remaining is not None:
+                remaining -= len(data)
+            
+            chunk = decoder.decode(data, final=not data)
+            if chunk:
+                collector.feed(chunk)
+            if not data:
+                collector.close()
+            
+            while collector.completed:
+                yield collector.completed.popleft()
+            
+            if not data:
+                break
 
 
-def _process_root_activity(facebook_path: Path, max_items: int) -> List[Article]:
-    """Process root level activity files"""
-    articles = []
-    
+def _extract_document_data(export_file: ExportEntry, content_type: str) -> Optional[Article]:
+    """Extract a whole export file (e.g. start_here.html) as a single item"""
     try:
-        root_files = [
-            "start_here.html"
-        ]
+        with export_file.open() as f:
+            soup = BeautifulSoup(io.TextIOWrapper(f, encoding='utf-8').read(), 'html.parser')
+        
+        title = soup.find('title')
+        if not title:
+            return None
+        
+        return Article(
+            title=title.get_text(strip=True),
+            url=f"facebook://root/{export_file.name}",
+            author="Facebook Data Export",
+            published_date=datetime.now(),
+            content=soup.get_text(strip=True)[:1000],  # Limit content
+            platform="facebook",
+            tags=["facebook_export", content_type]
+        )
         
-        for root_file in root_files:
-            if len(articles) >= max_items:
-                break
-                
-            file_path = facebook_path / root_file
-            if file_path.exists():
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    soup = BeautifulSoup(f.read(), 'html.parser')
-                    
-                    title = soup.find('title')
-                    if title:
-                        article = Article(
-                            title=title.get_text(strip=True),
-                            url=f"facebook://root/{root_file}",
-                            author="Facebook Data Export",
-                            published_date=datetime.now(),
-                            content=soup.get_text(strip=True)[:1000],  # Limit content
-                            platform="facebook",
-                            tags=["facebook_export", "root_activity"]
-                        )
-                        articles.append(article)
-                        
     except Exception as e:
-        logger.error(f"Error processing root activity: {str(e)}")
-    
-    return articles
+        logger.error(f"Error extracting document data: {str(e)}")
+        return None
 
 
-def _extract_post_data(section_elem, content_type: str) -> Optional[Article]:
+def _extract_post_data(
+    section_markup: str,
+    content_type: str,
+    timestamp_parser: Optional[FacebookTimestampParser] = None,
+    backend: str = "html.parser"
+) -> Optional[Article]:
     """Extract data from a Facebook post/activity section"""
     try:
-        # Extract title from h2 element
-        title_elem = section_elem.find('h2')
-        title = title_elem.get_text(strip=True) if title_elem else "Facebook Activity"
+        if backend == "lxml":
+            fields = _extract_section_fields_lxml(section_markup)
+        else:
+            fields = _extract_section_fields_soup(section_markup)
         
-        # Extract content from main div
-        content_elem = section_elem.find('div', class_='_a6-p')
-        content = content_elem.get_text(strip=True) if content_elem else ""
+        title = fields["title"] if fields["title"] is not None else "Facebook Activity"
+        content = fields["content"] or ""
         
-        # Extract timestamp from footer
-        footer_elem = section_elem.find('footer')
         timestamp = None
-        if footer_elem:
-            time_elem = footer_elem.find('div', class_='_a72d')
-            if time_elem:
-                timestamp_text = time_elem.get_text(strip=True)
-                timestamp = _parse_facebook_timestamp(timestamp_text)
+        if fields["timestamp"] is not None:
+            timestamp = _parse_facebook_timestamp(fields["timestamp"], timestamp_parser)
         
-        # Extract any links
-        links = []
-        for link_elem in section_elem.find_all('a'):
-            href = link_elem.get('href', '')
+        return _build_activity_article(title, content, timestamp, content_type, {
+            "content_type": content_type,
+            "links": fields["links"],
+            # Size of the section's source markup, known without re-serializing it
+            "raw_html_length": len(section_markup)
+        })
+        
+    except Exception as e:
+        logger.error(f"Error extracting post data: {str(e)}")
+        return None
+
+
+def _read_thread_title(export_file: ExportEntry) -> str:
+    """Return the <title> of a Messenger thread file, which names its participants"""
+    with export_file.open() as f:
+        head = f.read(THREAD_TITLE_READ_BYTES).decode('utf-8', errors='ignore')
+    match = re.search(r'<title>(.*?)</title>', head, re.DOTALL | re.IGNORECASE)
+    return html.unescape(match.group(1)).strip() if match else _thread_name(export_file)
+
+
+def _thread_name(export_file: ExportEntry) -> str:
+    """Name of the thread directory a message file belongs to, e.g. johndoe_1234567890"""
+    return PurePosixPath(export_file.member or Path(export_file.path).as_posix()).parent.name
+
+
+def _extract_message_data(
+    message_markup: str,
+    export_file: ExportEntry,
+    thread_title: str,
+    content_type: str,
+    timestamp_parser: Optional[FacebookTimestampParser] = None,
+    backend: str = "html.parser"
+) -> Optional[Article]:
+    """Extract data from one message (div._a6-g) of a Messenger thread file"""
+    try:
+        if backend == "lxml":
+            fields = _extract_message_fields_lxml(message_markup)
+        else:
+            fields = _extract_message_fields_soup(message_markup)
+        
+        sender = fields["sender"] or "Unknown"
+        sent_at = None
+        if fields["timestamp"]:
+            sent_at = (timestamp_parser or _default_timestamp_parser).parse(fields["timestamp"])
+        
+        thread = _thread_name(export_file)
+        return _build_activity_article(
+            f"Message from {sender}", fields["content"] or "", sent_at, content_type, {
+                "content_type": content_type,
+                "thread": thread,
+                "thread_title": thread_title,
+                "sender": sender,
+                "links": fields["links"],
+                "raw_html_length": len(message_markup)
+            },
+            identity=_message_identity(thread, sent_at, fields["timestamp"] or "")
+        )
+        
+    except Exception as e:
+        logger.error(f"Error extracting message data: {str(e)}")
+        return None
+
+
+def _message_identity(thread: str, sent_at: Optional[datetime], fallback: str = "") -> str:
+    """
+    Identity of a Messenger message, mixed into its URL hash since the same
+    text can be sent many times in a thread. It is the thread and the second
+    the message was sent, so a message gets the same URL from HTML and JSON
+    exports; fallback (the raw timestamp text) is used when it did not parse.
+    """
+    if sent_at is None:
+        return f"{thread}/{fallback}"
+    return f"{thread}/{int(sent_at.timestamp())}"
+
+
+def _extract_message_fields_soup(message_markup: str) -> dict:
+    """Collect sender (div._a6-h), content (div._a6-p), timestamp (div._a6-o) and links of a message"""
+    message = BeautifulSoup(message_markup, 'html.parser').find()
+    sender = message.find(class_='_a6-h')
+    content = message.find(class_='_a6-p')
+    timestamp = message.find(class_='_a6-o')
+    
+    return {
+        "sender": sender.get_text(strip=True) if sender is not None else None,
+        "content": content.get_text(strip=True) if content is not None else None,
+        "timestamp": timestamp.get_text(strip=True) if timestamp is not None else None,
+        "links": [
+            link['href'] for link in message.find_all('a', href=True)
+            if link['href'] and not link['href'].startswith('#')
+        ]
+    }
+
+
+def _extract_message_fields_lxml(message_markup: str) -> dict:
+    """Collect the same fields as _extract_message_fields_soup using lxml"""
+    message = lxml_html.fragment_fromstring(message_markup)
+    fields = {"sender": None, "content": None, "timestamp": None, "links": []}
+    
+    for elem in message.iterdescendants():
+        if elem.tag == 'a':
+            href = elem.get('href', '')
             if href and not href.startswith('#'):
-                links.append(href)
+                fields["links"].append(href)
+            continue
+        for name, class_name in (("sender", "_a6-h"), ("content", "_a6-p"), ("timestamp", "_a6-o")):
+            if fields[name] is None and class_name in elem.classes:
+                fields[name] = _lxml_text(elem)
+    
+    return fields
+
+
+def _extract_json_message(item: Any, export_file: ExportEntry, content_type: str) -> Optional[Article]:
+    """Extract data from one message of a Messenger thread JSON export"""
+    try:
+        if not isinstance(item, dict):
+            return None
         
-        # Create deterministic URL identifier using MD5 hash
-        content_hash = hashlib.md5((title + content).encode('utf-8')).hexdigest()
-        url = f"facebook://{content_type}/{content_hash}"
+        sender = _fix_json_text(item.get('sender_name') or "") or "Unknown"
+        content = _fix_json_text(item.get('content') or "").strip()
+        timestamp_ms = item.get('timestamp_ms')
+        published_date = datetime.fromtimestamp(timestamp_ms / 1000) if isinstance(timestamp_ms, (int, float)) else None
+        links = [share['link'] for share in [item.get('share') or {}] if share.get('link')]
         
-        # Extract tags based on content
-        tags = [content_type, "facebook"]
-        if "photo" in title.lower():
-            tags.append("photo")
-        if "comment" in title.lower():
-            tags.append("comment")
-        if "message" in title.lower():
-            tags.append("message")
-            
-        article = Article(
-            title=title,
-            url=url,
-            author="Nelson André",  # From the Facebook export data
-            published_date=timestamp or datetime.now(),
-            content=content,
-            platform="facebook",
-            tags=tags,
-            additional_data={
+        thread = _thread_name(export_file)
+        return _build_activity_article(
+            f"Message from {sender}", content, published_date, content_type, {
                 "content_type": content_type,
+                "thread": thread,
+                "sender": sender,
                 "links": links,
-                "raw_html_length": len(str(section_elem))
-            }
+                "source_format": "json"
+            },
+            identity=_message_identity(thread, published_date)
         )
         
-        return article
-        
     except Exception as e:
-        logger.error(f"Error extracting post data: {str(e)}")
+        logger.error(f"Error extracting JSON message: {str(e)}")
         return None
 
 
-def _parse_facebook_timestamp(timestamp_text: str) -> Optional[datetime]:
-    """Parse Facebook timestamp formats"""
+def _extract_json_item(item: Any, content_type: str) -> Optional[Article]:
+    """Extract data from one activity entry of a Facebook JSON export"""
     try:
-        # Handle empty or None timestamps
-        if not timestamp_text or not timestamp_text.strip():
-            return datetime.now()
-            
-        # Facebook timestamps are in Portuguese format from the export
-        # Examples: "Jun 03, 2025 10:53:49 da tarde", "Nov 16, 2024 12:44:41 da tarde"
+        if not isinstance(item, dict):
+            return None
         
-        # Replace Portuguese time indicators
-        timestamp_text = timestamp_text.replace(" da tarde", " PM")
-        timestamp_text = timestamp_text.replace(" da manhã", " AM")
-        timestamp_text = timestamp_text.replace(" da madrugada", " AM")
+        title = _fix_json_text(item.get('title') or "") or "Facebook Activity"
         
-        # Replace Portuguese month abbreviations
-        portuguese_months = {
-            "Jan": "Jan", "Fev": "Feb", "Mar": "Mar", "Abr": "Apr",
-            "Mai": "May", "Jun": "Jun", "Jul": "Jul", "Ago": "Aug",
-            "Set": "Sep", "Out": "Oct", "Nov": "Nov", "Dez": "Dec"
-        }
+        texts = []
+        links = []
+        _collect_json_values({key: value for key, value in item.items() if key != 'title'}, texts, links)
+        content = ''.join(texts)
         
-        for pt_month, en_month in portuguese_months.items():
-            timestamp_text = timestamp_text.replace(pt_month, en_month)
+        timestamp = item.get('timestamp') or item.get('creation_timestamp')
+        published_date = datetime.fromtimestamp(timestamp) if isinstance(timestamp, (int, float)) else None
         
-        # Try to parse the timestamp
-        try:
-            return datetime.strptime(timestamp_text, "%b %d, %Y %I:%M:%S %p")
-        except ValueError:
-            try:
-                return datetime.strptime(timestamp_text, "%d %b %Y %I:%M:%S %p")
-            except ValueError:
-                try:
-                    # Try without seconds
-                    return datetime.strptime(timestamp_text, "%b %d, %Y %I:%M %p")
-                except ValueError:
-                    # If parsing fails, return current time
-                    if timestamp_text.strip():  # Only log if timestamp is not empty
-                        logger.debug(f"Could not parse timestamp: {timestamp_text}")
-                    return datetime.now()
-                
+        return _build_activity_article(title, content, published_date, content_type, {
+            "content_type": content_type,
+            "links": links,
+            "source_format": "json"
+        })
+        
+    except Exception as e:
+        logger.error(f"Error extracting JSON item: {str(e)}")
+        return None
+
+
+def _collect_json_values(value: Any, texts: List[str], links: List[str]):
+    """Gather text and link strings from a nested JSON export entry in document order"""
+    if isinstance(value, dict):
+        for key, child in value.items():
+            if isinstance(child, str):
+                if key in JSON_TEXT_KEYS:
+                    text = _fix_json_text(child).strip()
+                    if text:
+                        texts.append(text)
+                elif key in JSON_LINK_KEYS and child:
+                    links.append(child)
+            else:
+                _collect_json_values(child, texts, links)
+    elif isinstance(value, list):
+        for child in value:
+            _collect_json_values(child, texts, links)
+
+
+def _fix_json_text(text: str) -> str:
+    """Undo the latin-1 escaping Facebook applies to UTF-8 text in JSON exports"""
+    try:
+        return text.encode('latin-1').decode('utf-8')
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return text
+
+
+def _build_activity_article(
+    title: str,
+    content: str,
+    timestamp: Optional[datetime],
+    content_type: str,
+    additional_data: dict,
+    identity: str = ""
+) -> Article:
+    """
+    Build the Article for an activity item, whichever export format it came
+    from. identity is mixed into the URL hash for items whose title and
+    content alone are not unique.
+    """
+    # Create deterministic URL identifier using MD5 hash
+    content_hash = hashlib.md5((title + content + identity).encode('utf-8')).hexdigest()
+    url = f"facebook://{content_type}/{content_hash}"
+    
+    # Extract tags based on content
+    tags = [content_type, "facebook"]
+    if "photo" in title.lower():
+        tags.append("photo")
+    if "comment" in title.lower():
+        tags.append("comment")
+    if "message" in title.lower():
+        tags.append("message")
+        
+    return Article(
+        title=title,
+        url=url,
+        author="Nelson André",  # From the Facebook export data
+        published_date=timestamp or datetime.now(),
+        content=content,
+        platform="facebook",
+        tags=tags,
+        additional_data=additional_data
+    )
+
+
+def _extract_section_fields_soup(section_markup: str) -> dict:
+    """
+    Collect title, content, timestamp and links from a section in a single
+    walk over a BeautifulSoup tree.
+    
+    Matches the first h2, the first div._a6-p, the first div._a72d inside the
+    first footer, and every non-anchor link.
+    """
+    section = BeautifulSoup(section_markup, 'html.parser').section
+    title_elem = content_elem = footer_elem = time_elem = None
+    links = []
+    
+    for elem in section.descendants:
+        name = getattr(elem, 'name', None)
+        if name == 'a':
+            href = elem.get('href', '')
+            if href and not href.startswith('#'):
+                links.append(href)
+        elif name == 'h2':
+            title_elem = title_elem if title_elem is not None else elem
+        elif name == 'footer':
+            footer_elem = footer_elem if footer_elem is not None else elem
+        elif name == 'div':
+            classes = elem.get('class') or []
+            if content_elem is None and '_a6-p' in classes:
+                content_elem = elem
+            elif time_elem is None and '_a72d' in classes and footer_elem is not None:
+                if any(parent is footer_elem for parent in elem.parents):
+                    time_elem = elem
+    
+    return {
+        "title": title_elem.get_text(strip=True) if title_elem is not None else None,
+        "content": content_elem.get_text(strip=True) if content_elem is not None else None,
+        "timestamp": time_elem.get_text(strip=True) if time_elem is not None else None,
+        "links": links
+    }
+
+
+def _extract_section_fields_lxml(section_markup: str) -> dict:
+    """
+    Collect the same fields as _extract_section_fields_soup using lxml and one
+    precompiled XPath that returns every element of interest in document order.
+    """
+    section = lxml_html.fragment_fromstring(section_markup)
+    title_elem = content_elem = footer_elem = time_elem = None
+    links = []
+    
+    for elem in _SECTION_FIELDS_XPATH(section):
+        tag = elem.tag
+        if tag == 'a':
+            href = elem.get('href', '')
+            if href and not href.startswith('#'):
+                links.append(href)
+        elif tag == 'h2':
+            title_elem = title_elem if title_elem is not None else elem
+        elif tag == 'footer':
+            footer_elem = footer_elem if footer_elem is not None else elem
+        elif content_elem is None and '_a6-p' in elem.classes:
+            content_elem = elem
+        elif time_elem is None and '_a72d' in elem.classes and footer_elem is not None:
+            if any(parent is footer_elem for parent in elem.iterancestors('footer')):
+                time_elem = elem
+    
+    return {
+        "title": _lxml_text(title_elem),
+        "content": _lxml_text(content_elem),
+        "timestamp": _lxml_text(time_elem),
+        "links": links
+    }
+
+
+def _lxml_text(elem) -> Optional[str]:
+    """Equivalent of BeautifulSoup's get_text(strip=True) for an lxml element"""
+    if elem is None:
+        return None
+    return ''.join(text.strip() for text in _VISIBLE_TEXT_XPATH(elem))
+
+
+def _parse_facebook_timestamp(timestamp_text: str, parser: Optional[FacebookTimestampParser] = None) -> Optional[datetime]:
+    """Parse Facebook timestamp formats, falling back to the current time"""
+    try:
+        # Facebook timestamps follow the export's locale, e.g.
+        # "Jun 03, 2025 10:53:49 da tarde", "Nov 16, 2024 12:44:41 da tarde"
+        return (parser or _default_timestamp_parser).parse(timestamp_text) or datetime.now()
+    
     except Exception as e:
         logger.error(f"Error parsing timestamp '{timestamp_text}': {str(e)}")
-        return datetime.now()
\ No newline at end of file
+        return datetime.now()
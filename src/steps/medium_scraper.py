@@ -1,127 +1,568 @@
-import time
-import requests
-import xml.etree.ElementTree as ET
+import os
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List
+from typing import Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+from lxml import etree
+from pymongo import MongoClient
 from zenml import step, get_step_context
-from bs4 import BeautifulSoup
 from src.models import Article
+from src.utils.feed_cache import FeedCache, item_digest
+from src.utils.html_text import html_to_text
+from src.utils.http_scheduler import HttpScheduler, default_scheduler
 import re
 
+logger = logging.getLogger(__name__)
+
+MEDIUM_BASE_URL = "https://medium.com"
+
+# "@username" for a user's feed, the bare name for a publication's feed
+MEDIUM_FEED_URL = "{base_url}/feed/{source}"
+
+# JSON flavour of Medium pages (?format=json): an author's archive, paged by
+# publication time, and a single post with its full body
+MEDIUM_ARCHIVE_URL = "{base_url}/@{username}/latest"
+MEDIUM_POST_URL = "{base_url}/p/{post_id}"
+
+# Medium prefixes its JSON responses to defeat JSON hijacking
+MEDIUM_JSON_PREFIX = "])}while(1);</x>"
+
+# Posts listed per archive page
+ARCHIVE_PAGE_SIZE = 25
+
+# Post ids are the hex suffix of post slugs and /p/ URLs
+MEDIUM_POST_ID_PATTERN = re.compile(r'^[0-9a-f]{8,12}$')
+
+# Paragraph types without readable text (images, embeds, section breaks)
+SKIPPED_PARAGRAPH_TYPES = {4, 11, 14}
+
+FEED_ACCEPT = 'application/rss+xml, application/xml, text/xml'
+
+CONTENT_ENCODED_TAG = '{http://purl.org/rss/1.0/modules/content/}encoded'
+DC_CREATOR_TAG = '{http://purl.org/dc/elements/1.1/}creator'
+
 
 @step(enable_cache=False)
-def scrape_medium_articles(username: str, max_articles: int = 50) -> List[Article]:
+def scrape_medium_articles(
+    username: str = "",
+    max_articles: int = 50,
+    force: bool = False,
+    feeds: Optional[List[str]] = None,
+    concurrency: int = 4,
+    base_url: str = MEDIUM_BASE_URL,
+    dry_run: bool = False,
+    run_id: str = ""
+) -> List[Article]:
     """
-    Scrape Medium articles from a user's RSS feed.
-    Uses RSS feed for reliable article discovery.
+    Scrape Medium articles from the RSS feeds of users and publications.
+    Uses RSS feeds for reliable article discovery.
+    
+    Feeds are fetched concurrently through the shared HTTP scheduler (one
+    pooled keep-alive session, rate limited per host), so the step takes
+    about as long as the slowest feed. Each feed is fetched
+    conditionally (ETag / Last-Modified from the previous run), so an
+    unchanged feed returns no articles after a 304. Items whose guid and
+    content hash match the feed cache were processed before and are skipped
+    without parsing their HTML.
+    
+    Args:
+        username: Medium username (without @); shorthand for feeds=["@username"]
+        max_articles: Maximum number of articles to return across all feeds
+        force: Fetch the full feeds and process every item, ignoring the feed cache
+        feeds: Feeds to scrape: "@username" for a user, a bare name for a publication
+        concurrency: Maximum number of feeds fetched at the same time
+        base_url: Medium origin, overridable to point at a local stand-in
+        dry_run: Leave the feed cache untouched, so the next run sees the same items
+        run_id: Pipeline run whose storage step commits the feed cache
+            updates; without one they are saved right away
+    
+    Returns:
+        List of Article objects for new or changed feed items, in feed order
     """
-    articles = []
+    sources = _medium_sources(username, feeds)
     metadata = {
         "medium.com": {
             "successful": 0,
             "total": 0,
-            "errors": []
+            "unchanged": 0,
+            "errors": [],
+            "feeds": {}
         }
     }
+    feed_cache = FeedCache()
     
-    try:
-        # Medium RSS feed URL
-        rss_url = f"https://medium.com/feed/@{username}"
-        
-        # Headers to mimic a real browser
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'application/rss+xml, application/xml, text/xml',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Connection': 'keep-alive',
-        }
-        
-        # Get the RSS feed
-        response = requests.get(rss_url, headers=headers)
-        response.raise_for_status()
+    results = []
+    if sources:
+        scheduler = default_scheduler()
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(sources)))) as executor:
+            results = list(executor.map(
+                lambda source: _scrape_medium_feed(scheduler, source, feed_cache, max_articles, force, base_url),
+                sources
+            ))
+    
+    # Merge in feed order; a post listed by both its author and a publication is kept once
+    articles = []
+    seen_urls = set()
+    for source, (feed_articles, feed_metadata, feed_state) in zip(sources, results):
+        metadata["medium.com"]["feeds"][source] = feed_metadata
+        for key in ("successful", "total", "unchanged", "errors"):
+            metadata["medium.com"][key] += feed_metadata[key]
         
-        # Parse RSS XML
-        root = ET.fromstring(response.content)
+        # Only items that are returned are recorded as processed, so the ones
+        # cut by max_articles come back on the next run
+        kept_all = feed_state["complete"]
+        for article, (guid, digest) in zip(feed_articles, feed_state["items"]):
+            if article.url not in seen_urls:
+                if len(articles) >= max_articles:
+                    kept_all = False
+                    continue
+                seen_urls.add(article.url)
+                articles.append(article)
+            if guid:
+                feed_cache.record_item(feed_state["url"], guid, digest)
         
-        # Find all items (articles) in the RSS feed
-        items = root.findall('.//item')
+        # Validators are only kept once every item they cover was returned,
+        # otherwise a 304 would hide the rest from the next run
+        if kept_all and feed_state["validators"] is not None:
+            feed_cache.record_validators(feed_state["url"], feed_state["validators"])
+    
+    if sources and not dry_run:
+        feed_cache.save(run_id)
+    logger.info(f"Scraped {len(articles)} Medium articles from {len(sources)} feeds")
+    
+    _add_output_metadata(metadata)
+    
+    return articles
+
+
+def _medium_sources(username: str, feeds: Optional[List[str]]) -> List[str]:
+    """Normalize the username and feed list into unique feed names, in order."""
+    sources = []
+    if username and username.strip():
+        sources.append(f"@{username.strip().lstrip('@')}")
+    for feed in feeds or []:
+        feed = feed.strip().strip('/')
+        if feed and feed not in sources:
+            sources.append(feed)
+    return sources
+
+
+def _scrape_medium_feed(
+    scheduler: HttpScheduler,
+    source: str,
+    feed_cache: FeedCache,
+    max_articles: int,
+    force: bool,
+    base_url: str = MEDIUM_BASE_URL
+) -> Tuple[List[Article], dict, dict]:
+    """
+    Fetch and extract one feed; returns its articles, per-feed metadata and
+    the feed cache updates to make for the articles that are kept: the
+    (guid, digest) of each article, the response validators, and whether
+    every item of the feed was processed.
+    """
+    articles = []
+    state = {
+        "url": None,
+        "items": [],
+        "validators": None,
+        "complete": False
+    }
+    metadata = {
+        "url": MEDIUM_FEED_URL.format(base_url=base_url.rstrip('/'), source=source),
+        "successful": 0,
+        "total": 0,
+        "unchanged": 0,
+        "not_modified": False,
+        "errors": []
+    }
+    
+    try:
+        # Medium RSS feed URL
+        rss_url = metadata["url"]
+        state["url"] = rss_url
         
-        # Limit to max_articles
-        items = items[:max_articles]
-        metadata["medium.com"]["total"] = len(items)
+        headers = {}
+        if not force:
+            headers.update(feed_cache.conditional_headers(rss_url))
         
-        # Process each article
-        for i, item in enumerate(items):
-            try:
-                # Extract basic information from RSS
-                title_elem = item.find('title')
-                title = title_elem.text if title_elem is not None else f"Medium Article {i+1}"
+        # Get the RSS feed; items are parsed and processed as they download
+        feed_guids = []
+        truncated = False
+        with scheduler.get(rss_url, headers={'Accept': FEED_ACCEPT, **headers}, stream=True) as response:
+            if response.status_code == 304:
+                logger.info(f"Medium feed {source} not modified since last run")
+                metadata["not_modified"] = True
+                return articles, metadata, state
+            response.raise_for_status()
+            response.raw.decode_content = True
+            
+            for i, item in enumerate(_iter_feed_items(response.raw)):
+                guid = _item_guid(item)
+                feed_guids.append(guid)
                 
-                link_elem = item.find('link')
-                article_url = link_elem.text if link_elem is not None else ""
-                
-                # Extract publication date
-                published_date = None
-                pubdate_elem = item.find('pubDate')
-                if pubdate_elem is not None:
-                    try:
-                        # Parse RFC 2822 date format from RSS
-                        published_date = datetime.strptime(pubdate_elem.text, '%a, %d %b %Y %H:%M:%S %Z')
-                    except:
+                try:
+                    # Skip items processed before with the same content
+                    content_elem = item.find(CONTENT_ENCODED_TAG)
+                    digest = item_digest(
+                        item.findtext('title'),
+                        item.findtext('pubDate'),
+                        content_elem.text if content_elem is not None else None,
+                        *[cat_elem.text for cat_elem in item.findall('category')]
+                    )
+                    if guid and not force and feed_cache.is_item_unchanged(rss_url, guid, digest):
+                        metadata["unchanged"] += 1
+                        metadata["total"] += 1
+                        continue
+                    
+                    # Limit to max_articles new items; later ones are only listed for the feed cache
+                    if len(articles) >= max_articles:
+                        truncated = True
+                        continue
+                    metadata["total"] += 1
+                    
+                    # Extract basic information from RSS
+                    title_elem = item.find('title')
+                    title = title_elem.text if title_elem is not None else f"Medium Article {i+1}"
+                    
+                    link_elem = item.find('link')
+                    article_url = link_elem.text if link_elem is not None else ""
+                    
+                    # Extract publication date
+                    published_date = None
+                    pubdate_elem = item.find('pubDate')
+                    if pubdate_elem is not None:
                         try:
-                            # Try alternative format
-                            published_date = datetime.strptime(pubdate_elem.text, '%a, %d %b %Y %H:%M:%S GMT')
+                            # Parse RFC 2822 date format from RSS
+                            published_date = datetime.strptime(pubdate_elem.text, '%a, %d %b %Y %H:%M:%S %Z')
                         except:
-                            pass
-                
-                # Extract content from RSS (CDATA content)
-                content = ""
-                content_elem = item.find('.//{http://purl.org/rss/1.0/modules/content/}encoded')
-                if content_elem is not None:
-                    # Parse HTML content and extract text
-                    soup = BeautifulSoup(content_elem.text, 'html.parser')
-                    # Remove images and get text from paragraphs
-                    for img in soup.find_all('img'):
-                        img.decompose()
-                    paragraphs = soup.find_all('p')
-                    content = ' '.join([p.get_text(strip=True) for p in paragraphs[:10]])  # First 10 paragraphs
-                
-                # Extract tags/categories
-                tags = []
-                category_elems = item.findall('category')
-                for cat_elem in category_elems:
-                    if cat_elem.text:
-                        tags.append(cat_elem.text.strip())
-                
-                # Create Article object
-                article = Article(
-                    title=title,
-                    url=article_url,
-                    platform="medium",
-                    content=content,
-                    author=username,
-                    published_date=published_date,
-                    tags=tags,
-                    engagement_metrics={},  # Not available in RSS
-                    scraped_at=datetime.now()
-                )
-                
-                articles.append(article)
-                metadata["medium.com"]["successful"] += 1
-                
-            except Exception as e:
-                error_msg = f"Error processing Medium article from RSS: {e}"
-                print(error_msg)
-                metadata["medium.com"]["errors"].append(error_msg)
-                continue
+                            try:
+                                # Try alternative format
+                                published_date = datetime.strptime(pubdate_elem.text, '%a, %d %b %Y %H:%M:%S GMT')
+                            except:
+                                pass
+                    
+                    # Extract content from RSS (CDATA content)
+                    content = ""
+                    if content_elem is not None:
+                        # Text of the first 10 paragraphs, in one parse of the HTML
+                        content = html_to_text(content_elem.text, 'p', limit=10)
+                    
+                    # Extract tags/categories
+                    tags = []
+                    category_elems = item.findall('category')
+                    for cat_elem in category_elems:
+                        if cat_elem.text:
+                            tags.append(cat_elem.text.strip())
+                    
+                    # User feeds are attributed to the user, publication feeds to each post's writer
+                    if source.startswith('@'):
+                        author = source[1:]
+                    else:
+                        author = (item.findtext(DC_CREATOR_TAG) or source).strip()
+                    
+                    # Create Article object
+                    article = Article(
+                        title=title,
+                        url=article_url,
+                        platform="medium",
+                        content=content,
+                        author=author,
+                        published_date=published_date,
+                        tags=tags,
+                        engagement_metrics={},  # Not available in RSS
+                        additional_data={
+                            "feed": source,
+                            "feed_type": "user" if source.startswith('@') else "publication",
+                            "guid": guid
+                        },
+                        scraped_at=datetime.now()
+                    )
+                    
+                    articles.append(article)
+                    state["items"].append((guid, digest))
+                    metadata["successful"] += 1
+                    
+                except Exception as e:
+                    error_msg = f"Error processing Medium article from RSS {source}: {e}"
+                    print(error_msg)
+                    metadata["errors"].append(error_msg)
+                    continue
+        
+        feed_cache.retain_items(rss_url, feed_guids)
+        
+        state["validators"] = {name: response.headers.get(name) for name in ('ETag', 'Last-Modified')}
+        state["complete"] = not metadata["errors"] and not truncated
+        if metadata["unchanged"]:
+            logger.info(f"Skipped {metadata['unchanged']} unchanged items of Medium feed {source}")
                 
     except Exception as e:
-        error_msg = f"Error fetching Medium RSS feed: {e}"
+        error_msg = f"Error fetching Medium RSS feed {source}: {e}"
         print(error_msg)
-        metadata["medium.com"]["errors"].append(error_msg)
+        metadata["errors"].append(error_msg)
     
-    # Add metadata to step context
+    return articles, metadata, state
+
+
+def _iter_feed_items(stream) -> Iterator[etree._Element]:
+    """Yield each <item> of an RSS stream as soon as it is parsed, freeing it afterwards."""
+    for _, item in etree.iterparse(stream, events=('end',), tag='item', resolve_entities=False, no_network=True):
+        yield item
+        item.clear()
+        while item.getprevious() is not None:
+            del item.getparent()[0]
+
+
+def _item_guid(item) -> str:
+    """Return the guid of a feed item, falling back to its link."""
+    return (item.findtext('guid') or item.findtext('link') or '').strip()
+
+
+def _add_output_metadata(metadata: dict):
+    """Add metadata to step context"""
     step_context = get_step_context()
     step_context.add_output_metadata(output_name="output", metadata=metadata)
+
+@step(enable_cache=False)
+def fetch_medium_full_articles(
+    articles: List[Article],
+    usernames: Optional[List[str]] = None,
+    max_articles: int = 50,
+    concurrency: int = 4,
+    retries: int = 3,
+    base_url: str = MEDIUM_BASE_URL,
+    connection_string: str = None,
+    database_name: str = None,
+    collection_name: str = None
+) -> List[Article]:
+    """
+    Replace the truncated RSS content of Medium articles with the full post
+    bodies, and backfill older posts from each author's archive.
+    
+    The RSS feed only lists an author's latest posts, with the first
+    paragraphs of each. This stage pages through the authors' archives,
+    drops posts already stored in MongoDB, and fetches the remaining bodies
+    concurrently (bounded by concurrency) with retries and exponential
+    backoff on throttling and server errors.
+    
+    Args:
+        articles: Medium articles from scrape_medium_articles
+        usernames: Authors whose archives are backfilled (without @)
+        max_articles: Maximum number of backfilled archive posts
+        concurrency: Maximum number of requests in flight
+        retries: Attempts per request after the first one
+        base_url: Medium origin, overridable to point at a local stand-in
+        connection_string: MongoDB connection string used to skip stored posts
+        database_name: MongoDB database name
+        collection_name: MongoDB collection name
+    
+    Returns:
+        The input articles with full content, followed by the backfilled posts
+    """
+    base_url = base_url.rstrip('/')
+    metadata = {
+        "medium_full_articles": {
+            "enriched": 0,
+            "archive_posts": 0,
+            "already_stored": 0,
+            "backfilled": 0,
+            "errors": []
+        }
+    }
+    stats = metadata["medium_full_articles"]
+    
+    stored_ids = _stored_post_ids(connection_string, database_name, collection_name)
+    post_ids = [
+        _medium_post_id((article.additional_data or {}).get("guid", "")) or _medium_post_id(article.url)
+        for article in articles
+    ]
+    feed_ids = set(post_ids)
+    
+    scheduler = default_scheduler()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        # Archives are paged by cursor, so each author is listed sequentially
+        archive_posts = []
+        for posts in executor.map(
+            lambda username: _list_archive_posts(scheduler, base_url, username, retries, stats),
+            usernames or []
+        ):
+            archive_posts.extend(posts)
+        stats["archive_posts"] = len(archive_posts)
+        
+        backfill = []
+        for username, post in archive_posts:
+            if post["id"] in stored_ids:
+                stats["already_stored"] += 1
+            elif post["id"] not in feed_ids and len(backfill) < max_articles:
+                feed_ids.add(post["id"])
+                backfill.append((username, post))
+        
+        # Full bodies of this run's feed articles and of the backfilled posts
+        post_ids += [post["id"] for _, post in backfill]
+        bodies = list(executor.map(
+            lambda post_id: _fetch_post_body(scheduler, base_url, post_id, retries, stats),
+            post_ids
+        ))
+    
+    full_articles = []
+    for article, body in zip(articles, bodies):
+        if body:
+            article = article.model_copy(update={
+                "content": body,
+                "additional_data": {**(article.additional_data or {}), "full_content": True}
+            })
+            stats["enriched"] += 1
+        full_articles.append(article)
+    
+    for (username, post), body in zip(backfill, bodies[len(articles):]):
+        if body is None:
+            continue
+        full_articles.append(_build_archive_article(base_url, username, post, body))
+        stats["backfilled"] += 1
+    
+    logger.info(
+        f"Fetched full content for {stats['enriched']} feed articles and backfilled "
+        f"{stats['backfilled']} archive posts ({stats['already_stored']} already stored)"
+    )
+    _add_output_metadata(metadata)
+    
+    return full_articles
+
+
+def _medium_post_id(url: str) -> str:
+    """Return the post id at the end of a Medium post URL or guid, or ''."""
+    path = urlparse(url or '').path.rstrip('/')
+    candidate = path.rsplit('/', 1)[-1].rsplit('-', 1)[-1]
+    return candidate if MEDIUM_POST_ID_PATTERN.match(candidate) else ''
+
+
+def _stored_post_ids(connection_string: str, database_name: str, collection_name: str) -> set:
+    """Load the ids of Medium posts already in MongoDB with one projected query."""
+    connection_string = connection_string or os.getenv('MONGO_CONNECTION_STRING', 'mongodb://localhost:27017/')
+    database_name = database_name or os.getenv('MONGO_DATABASE', 'publications_db')
+    collection_name = collection_name or os.getenv('MONGO_COLLECTION', 'articles')
+    
+    try:
+        client = MongoClient(connection_string)
+        collection = client[database_name][collection_name]
+        stored = {
+            _medium_post_id(document.get("url", ""))
+            for document in collection.find({"platform": "medium"}, {"url": 1, "_id": 0})
+        }
+        client.close()
+    except Exception as e:
+        logger.warning(f"Could not load stored Medium posts, fetching all: {str(e)}")
+        return set()
+    
+    stored.discard('')
+    return stored
+
+
+def _get_medium_json(scheduler: HttpScheduler, url: str, retries: int, params: dict = None) -> dict:
+    """
+    GET a Medium page as JSON; the scheduler retries connection errors,
+    throttling and server errors with backoff (or the server's Retry-After).
+    """
+    params = {**(params or {}), "format": "json"}
+    response = scheduler.get(url, params=params, headers={'Accept': 'application/json'}, retries=retries)
+    response.raise_for_status()
+    
+    text = response.text
+    if text.startswith(MEDIUM_JSON_PREFIX):
+        text = text[len(MEDIUM_JSON_PREFIX):]
+    return json.loads(text)
+
+
+def _list_archive_posts(
+    scheduler: HttpScheduler,
+    base_url: str,
+    username: str,
+    retries: int,
+    stats: dict
+) -> List[Tuple[str, dict]]:
+    """Page through an author's archive, newest first; returns (username, post) pairs."""
+    username = username.strip().lstrip('@')
+    url = MEDIUM_ARCHIVE_URL.format(base_url=base_url, username=username)
+    posts = []
+    seen = set()
+    params = {"limit": ARCHIVE_PAGE_SIZE}
+    
+    try:
+        while True:
+            payload = _get_medium_json(scheduler, url, retries, params).get("payload", {})
+            page = [post for post in payload.get("references", {}).get("Post", {}).values()
+                    if post.get("id") and post["id"] not in seen]
+            if not page:
+                break
+            for post in page:
+                seen.add(post["id"])
+                posts.append((username, post))
+            
+            next_page = payload.get("paging", {}).get("next")
+            if not next_page or "to" not in next_page:
+                break
+            params = {"limit": ARCHIVE_PAGE_SIZE, "to": next_page["to"]}
+    except Exception as e:
+        error_msg = f"Error listing Medium archive of @{username}: {e}"
+        print(error_msg)
+        stats["errors"].append(error_msg)
+    
+    return posts
+
+
+def _fetch_post_body(
+    scheduler: HttpScheduler,
+    base_url: str,
+    post_id: str,
+    retries: int,
+    stats: dict
+) -> Optional[str]:
+    """Fetch the full text of a post, one paragraph per line; None on failure."""
+    if not post_id:
+        return None
+    
+    try:
+        payload = _get_medium_json(scheduler, MEDIUM_POST_URL.format(base_url=base_url, post_id=post_id), retries)
+        paragraphs = (
+            payload.get("payload", {}).get("value", {})
+            .get("content", {}).get("bodyModel", {}).get("paragraphs", [])
+        )
+        return '\n'.join(
+            paragraph["text"] for paragraph in paragraphs
+            if paragraph.get("text") and paragraph.get("type") not in SKIPPED_PARAGRAPH_TYPES
+        )
+    except Exception as e:
+        error_msg = f"Error fetching Medium post {post_id}: {e}"
+        print(error_msg)
+        stats["errors"].append(error_msg)
+        return None
+
+
+def _build_archive_article(base_url: str, username: str, post: dict, content: str) -> Article:
+    """Create an Article from an archive listing entry and its full body."""
+    virtuals = post.get("virtuals", {})
+    published_at = post.get("firstPublishedAt") or post.get("createdAt")
     
-    return articles
\ No newline at end of file
+    return Article(
+        title=post.get("title") or f"Medium Article {post['id']}",
+        url=f"{base_url}/@{username}/{post.get('uniqueSlug') or post['id']}",
+        platform="medium",
+        content=content,
+        summary=virtuals.get("subtitle") or None,
+        author=username,
+        published_date=datetime.fromtimestamp(published_at / 1000) if published_at else None,
+        tags=[tag["name"] for tag in virtuals.get("tags", []) if tag.get("name")],
+        engagement_metrics={
+            "claps": virtuals.get("totalClapCount", 0),
+            "comments": virtuals.get("responsesCreatedCount", 0)
+        },
+        additional_data={
+            "feed": f"@{username}",
+            "feed_type": "archive",
+            "guid": MEDIUM_POST_URL.format(base_url=base_url, post_id=post["id"]),
+            "full_content": True
+        },
+        scraped_at=datetime.now()
+    )
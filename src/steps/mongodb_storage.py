@@ -1,20 +1,59 @@
-from typing import List
+from typing import List, Optional
 from zenml import step, get_step_context
-from pymongo import MongoClient
-from pymongo.errors import DuplicateKeyError
+from pymongo import MongoClient, ASCENDING, UpdateOne
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError
 from src.models import Article
+from src.utils.url_index import UrlIndex
+from src.utils.pending_state import commit_pending_state, discard_pending_state
 import os
 
 
+# Fields set on X tweets by the scraper's conversation pass
+CONVERSATION_INDEX = [
+    ("additional_data.conversation_id", ASCENDING),
+    ("additional_data.conversation_depth", ASCENDING)
+]
+
+# additional_data fields brought up to date on stored documents ($set), while
+# the rest of an article is only written when it is first inserted
+REFRESHED_FIELDS = ("conversation_id", "conversation_depth")
+
+# Write error code of an upsert that lost a race against another writer of the same URL
+DUPLICATE_KEY_ERROR = 11000
+
+
 @step(enable_cache=False)
 def store_articles_in_mongodb(
     articles: List[Article],
     connection_string: str = None,
     database_name: str = None,
-    collection_name: str = None
+    collection_name: str = None,
+    batch_size: int = 1000,
+    use_url_index: bool = True,
+    rebuild_url_index: bool = False,
+    dry_run: bool = False,
+    run_id: str = ""
 ) -> dict:
     """
     Store scraped articles in MongoDB.
+
+    Articles are written in unordered bulk batches of `batch_size` upserts
+    keyed by URL. `$setOnInsert` only fills new documents, so articles
+    already stored are counted as duplicates; only their REFRESHED_FIELDS
+    (the X conversation of a tweet) are `$set`, and counted as updated
+    when they changed.
+
+    With the local URL index, refreshed first from the documents scraped
+    since the last run, articles already stored are dropped before any
+    write, unless they carry REFRESHED_FIELDS.
+
+    A dry run writes nothing: it only counts the new articles
+    (`new_articles`), checking the remaining URLs with one query per batch.
+
+    The export manifest and feed cache entries staged by the scrapers of
+    run_id are committed only when every article was stored; otherwise they
+    are dropped, so the same files and feed items are read again next run.
     Returns a dictionary with storage statistics.
     """
     # Use environment variables if parameters not provided
@@ -27,8 +66,12 @@ def store_articles_in_mongodb(
         'stored_articles': 0,
         'updated_articles': 0,
         'duplicate_articles': 0,
-        'errors': 0
+        'errors': 0,
+        'batches': 0,
+        'new_articles': 0,
+        'dry_run': dry_run
     }
+    url_index = None
     
     try:
         # Connect to MongoDB
@@ -36,37 +79,48 @@ def store_articles_in_mongodb(
         db = client[database_name]
         collection = db[collection_name]
         
-        # Create index on URL to prevent duplicates
-        collection.create_index([("url", 1)], unique=True)
+        if not dry_run:
+            # Create index on URL to prevent duplicates
+            collection.create_index([("url", 1)], unique=True)
+            # Reply threads (X tweets) are fetched by conversation in one query
+            collection.create_index(CONVERSATION_INDEX, sparse=True)
         
+        if use_url_index:
+            url_index = UrlIndex(connection_string, database_name, collection_name)
+            if rebuild_url_index:
+                url_index.clear()
+            url_index.refresh(collection)
+        
+        seen_urls = set()
+        batch = []
         for article in articles:
             try:
-                # Convert Article to dictionary
-                article_dict = article.model_dump()
-                
-                # Check if article already exists
-                existing_article = collection.find_one({"url": article.url})
+                # Repeated URLs are settled here instead of costing a write each
+                if article.url in seen_urls:
+                    stats['duplicate_articles'] += 1
+                    continue
+                seen_urls.add(article.url)
                 
-                if existing_article:
-                    # Article already exists, skip it
+                # Known URLs are dropped locally, without touching MongoDB,
+                # unless they have fields to bring up to date
+                if url_index is not None and article.url in url_index and not _refreshed_fields(article.additional_data):
                     stats['duplicate_articles'] += 1
-                else:
-                    # New article, insert it
-                    try:
-                        result = collection.insert_one(article_dict)
-                        if result.inserted_id:
-                            stats['stored_articles'] += 1
-                        else:
-                            print(f"Failed to get insert ID for: {article.title[:50]}...")
-                            stats['errors'] += 1
-                    except Exception as e:
-                        print(f"Error inserting article '{article.title[:50]}...' (URL: {article.url}): {e}")
-                        stats['errors'] += 1
-                        
+                    continue
+                
+                # Convert Article to dictionary
+                batch.append(article.model_dump())
             except Exception as e:
                 print(f"Error processing article '{getattr(article, 'title', 'Unknown')}': {e}")
                 print(f"Article data: {article}")
                 stats['errors'] += 1
+                continue
+            
+            if len(batch) >= batch_size:
+                _store_batch(collection, batch, stats, url_index, dry_run)
+                batch = []
+        
+        if batch:
+            _store_batch(collection, batch, stats, url_index, dry_run)
                 
         # Close connection
         client.close()
@@ -74,6 +128,20 @@ def store_articles_in_mongodb(
     except Exception as e:
         print(f"Error connecting to MongoDB: {e}")
         stats['errors'] = len(articles)
+    finally:
+        if url_index is not None:
+            url_index.close()
+    
+    if dry_run:
+        print(f"Dry run: {stats['new_articles']} of {stats['total_articles']} articles would be stored")
+    
+    if run_id:
+        if stats['errors'] or dry_run:
+            discard_pending_state(run_id)
+            if stats['errors']:
+                print(f"{stats['errors']} articles were not stored; their sources will be read again on the next run")
+        else:
+            commit_pending_state(run_id)
     
     # Add metadata to step context
     step_context = get_step_context()
@@ -90,6 +158,103 @@ def store_articles_in_mongodb(
     return stats
 
 
+def _store_batch(collection: Collection, batch: List[dict], stats: dict, url_index: Optional[UrlIndex], dry_run: bool):
+    if dry_run:
+        _count_new_batch(collection, batch, stats)
+        return
+    written_urls = _write_batch(collection, batch, stats)
+    if url_index is not None:
+        url_index.add(written_urls)
+
+
+def _count_new_batch(collection: Collection, batch: List[dict], stats: dict):
+    """Count the articles of a batch missing from the collection, with one query."""
+    stats['batches'] += 1
+    urls = [document["url"] for document in batch]
+    stored = {document["url"] for document in collection.find({"url": {"$in": urls}}, {"url": 1, "_id": 0})}
+    stats['duplicate_articles'] += len(stored)
+    stats['new_articles'] += len(batch) - len(stored)
+
+
+def _refreshed_fields(additional_data: Optional[dict]) -> dict:
+    """Return the REFRESHED_FIELDS of an article's additional_data as dotted $set paths."""
+    return {
+        f"additional_data.{field}": additional_data[field]
+        for field in REFRESHED_FIELDS if additional_data and field in additional_data
+    }
+
+
+def _upsert_operation(document: dict) -> UpdateOne:
+    """
+    Insert an article document if its URL is new, and bring its
+    REFRESHED_FIELDS up to date either way.
+    """
+    refreshed = _refreshed_fields(document.get("additional_data"))
+    if not refreshed:
+        return UpdateOne({"url": document["url"]}, {"$setOnInsert": document}, upsert=True)
+    
+    # $setOnInsert and $set may not both write additional_data, so the
+    # inserted part is spelled out field by field
+    on_insert = {key: value for key, value in document.items() if key != "additional_data"}
+    on_insert.update({
+        f"additional_data.{field}": value
+        for field, value in document["additional_data"].items() if field not in REFRESHED_FIELDS
+    })
+    return UpdateOne({"url": document["url"]}, {"$setOnInsert": on_insert, "$set": refreshed}, upsert=True)
+
+
+def _write_batch(collection: Collection, batch: List[dict], stats: dict) -> List[str]:
+    """
+    Upsert a batch of article documents in one unordered bulk write and add
+    its outcome to stats: upserts are stored articles, matches are duplicates
+    (updated when a refreshed field changed) and each failed operation is an
+    error, except upserts that lost a race for their URL, which are duplicates.
+    Returns the URLs now stored in the collection.
+    """
+    stats['batches'] += 1
+    operations = [_upsert_operation(document) for document in batch]
+    try:
+        result = collection.bulk_write(operations, ordered=False)
+        stats['stored_articles'] += result.upserted_count
+        stats['updated_articles'] += result.modified_count
+        stats['duplicate_articles'] += result.matched_count - result.modified_count
+        stats['new_articles'] += result.upserted_count
+        return [document["url"] for document in batch]
+    except BulkWriteError as e:
+        details = e.details
+    except Exception as e:
+        print(f"Error writing batch of {len(batch)} articles: {e}")
+        stats['errors'] += len(batch)
+        return []
+    
+    # Unordered writes apply every operation that did not fail
+    stats['stored_articles'] += details.get('nUpserted', 0)
+    stats['updated_articles'] += details.get('nModified', 0)
+    stats['duplicate_articles'] += details.get('nMatched', 0) - details.get('nModified', 0)
+    stats['new_articles'] += details.get('nUpserted', 0)
+    failed = set()
+    for error in details.get('writeErrors', []):
+        if error.get('code') == DUPLICATE_KEY_ERROR:
+            stats['duplicate_articles'] += 1
+            continue
+        document = batch[error['index']]
+        print(f"Error inserting article '{document['title'][:50]}...' (URL: {document['url']}): {error.get('errmsg')}")
+        stats['errors'] += 1
+        failed.add(error['index'])
+    return [document["url"] for index, document in enumerate(batch) if index not in failed]
+
+
+def find_conversation(collection: Collection, conversation_id: str) -> List[dict]:
+    """
+    Return every stored tweet of a reply thread, top first, with one query
+    served by the conversation index.
+    """
+    return list(
+        collection.find({"additional_data.conversation_id": conversation_id})
+        .sort(CONVERSATION_INDEX + [("published_date", ASCENDING)])
+    )
+
+
 @step(enable_cache=False)
 def get_stored_articles_count(
     platform: str = "",
@@ -1,27 +1,120 @@
 from zenml import step
-from typing import List, Optional
-import time
+from typing import List, NamedTuple, Optional, Tuple
+import html
+import heapq
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
+from urllib.parse import urljoin, urlparse
 import requests
+import dateutil.parser
 from bs4 import BeautifulSoup
+from lxml import etree
 from src.models import Article
+from src.utils.config import config
+from src.utils.feed_cache import FeedCache
+from src.utils.html_text import html_to_text
+from src.utils.http_scheduler import HttpScheduler, default_scheduler
+from src.utils.json_state import load_json_state, save_json_state
 import re
 import json
 
 logger = logging.getLogger(__name__)
 
+# Listing page URL layouts probed, in order, when a blog links no further pages
+PAGINATION_PATTERNS = [
+    "{base}/?paged={page}",
+    "{base}/page/{page}/",
+    "{raw}?page={page}"
+]
+
+# Candidate CSS selectors per post field, probed in order to learn a site profile
+SELECTOR_CANDIDATES = {
+    "post": [
+        "article",
+        ".post",
+        ".blog-post",
+        ".entry",
+        "[class*='post-']",
+        ".jet-listing-item",
+        ".elementor-post",
+        ".wp-block-post"
+    ],
+    "title": ['h1', 'h2', 'h3', '.title', '.post-title', '.entry-title', '[class*="title"]'],
+    "date": ['.date', '.published', '.post-date', '.entry-date', 'time', '[class*="date"]'],
+    "content": ['.excerpt', '.summary', '.content', '.entry-content', '.post-content', 'p'],
+    "author": ['.author', '.by-author', '.post-author', '[class*="author"]'],
+    "category": ['.category', '.categories', '.tags', '.post-category', '[class*="categor"]']
+}
+
+# Learned selectors per site, reused across pages and runs
+PROFILES_FILE_NAME = "selector_profiles.json"
+
+# Page number in the links of a WordPress-style blog pagination
+PAGINATION_LINK_PATTERN = re.compile(r'(?:/page/|[?&](?:paged|page)=)(\d+)/?(?:$|[?&])')
+
+# WordPress REST API listing of posts, and the largest page it serves
+WP_POSTS_API_PATH = "/wp-json/wp/v2/posts"
+WP_API_PAGE_SIZE = 100
+
+# Sitemaps tried in order: WordPress core, then Yoast / Rank Math and the generic location
+SITEMAP_PATHS = ["/wp-sitemap.xml", "/sitemap_index.xml", "/sitemap.xml"]
+SITEMAP_NAMESPACES = {"sm": "http://www.sitemaps.org/schemas/sitemap/0.9"}
+
+# Sitemaps of the "post" type: WordPress core (not wp-sitemap-posts-page-N.xml) and Yoast / Rank Math
+POST_SITEMAP_PATTERN = re.compile(r'^(?:wp-sitemap-posts-post-\d+|post-sitemap\d*)\.xml$')
+
+# Sitemap indexes followed at most this deep
+MAX_SITEMAP_DEPTH = 2
+
+
+class DiscoveredPost(NamedTuple):
+    """A post listed by the REST API or a sitemap, with its modification date."""
+    url: str
+    lastmod: Optional[str]
+    post_id: Optional[int] = None
+
+
 @step
 def scrape_npblog_articles(
     base_url: str = "https://www.nearpartner.com/blog/",
-    max_articles: int = 100
+    max_articles: int = 100,
+    concurrency: int = 4,
+    max_pages: int = 10,
+    force: bool = False,
+    dry_run: bool = False,
+    run_id: str = ""
 ) -> List[Article]:
     """
     Scrapes articles from NearPartner blog using requests and BeautifulSoup.
     
+    Posts are discovered from the WordPress REST API (/wp-json/wp/v2/posts)
+    or, failing that, the site's sitemaps, which list every post URL with its
+    last modification date in a request or two. Only posts that are new or
+    modified since the lastmod stored by the previous run (CACHE_DIR/
+    feed_cache.json) are fetched: in batches from the REST API, or one page
+    per post for sitemap-only sites.
+    
+    Sites with neither are crawled through their listing pages from a
+    frontier ordered by page number: the pagination links found on each page
+    are added to it, and pages are fetched `concurrency` at a time. When the
+    blog links no further pages, the pagination URL layout is probed once
+    and then used for the following pages. Crawling stops at the first page
+    that yields no new article. Listing pages are extracted with the site's
+    selector profile (CACHE_DIR/selector_profiles.json), learned by probing
+    every candidate selector on the first page and relearned whenever it
+    stops matching.
+    
     Args:
         base_url: The blog URL to scrape
         max_articles: Maximum number of articles to scrape
+        concurrency: Number of pages fetched at the same time
+        max_pages: Maximum number of listing pages to fetch when crawling
+        force: Fetch every discovered post, ignoring the stored lastmod dates
+        dry_run: Leave the stored lastmod dates untouched
+        run_id: Pipeline run whose storage step commits the lastmod dates;
+            without one they are saved right away
     
     Returns:
         List of Article objects containing blog posts
@@ -29,62 +122,20 @@ def scrape_npblog_articles(
     articles = []
     
     try:
-        # Set up session with headers
-        session = requests.Session()
-        session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
-        
-        # Load multiple pages to get more articles
-        page = 1
-        max_pages = 10  # Reasonable limit
-        
-        while len(articles) < max_articles and page <= max_pages:
-            # Try different URL patterns for pagination
-            url_patterns = [
-                f"{base_url.rstrip('/')}/?paged={page}",
-                f"{base_url.rstrip('/')}/page/{page}/",
-                f"{base_url}?page={page}",
-                base_url if page == 1 else None
-            ]
-            
-            page_articles_found = False
-            
-            for url_pattern in url_patterns:
-                if not url_pattern:
-                    continue
-                    
-                try:
-                    logger.info(f"Fetching page {page}: {url_pattern}")
-                    response = session.get(url_pattern, timeout=10)
-                    response.raise_for_status()
-                    
-                    soup = BeautifulSoup(response.content, 'html.parser')
-                    page_articles = _extract_blog_posts(soup)
-                    
-                    # Add new articles that we haven't seen before
-                    new_articles = []
-                    for article in page_articles:
-                        if not any(existing.url == article.url for existing in articles):
-                            new_articles.append(article)
-                    
-                    if new_articles:
-                        articles.extend(new_articles)
-                        logger.info(f"Found {len(new_articles)} new articles on page {page}")
-                        page_articles_found = True
-                        break
-                    
-                except requests.RequestException as e:
-                    logger.warning(f"Error fetching {url_pattern}: {str(e)}")
-                    continue
-            
-            # If no articles found on this page, stop trying
-            if not page_articles_found:
-                logger.info(f"No new articles found on page {page}, stopping pagination")
-                break
-                
-            page += 1
-            time.sleep(1)  # Be respectful to the server
+        # Requests are paced per host by the shared scheduler
+        scheduler = default_scheduler()
+        
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            source_url, discovered = _discover_posts(scheduler, executor, base_url)
+            if discovered:
+                articles = _fetch_discovered_posts(
+                    scheduler, executor, source_url, discovered, max_articles, force, dry_run, run_id
+                )
+            else:
+                logger.info("No WordPress API or sitemap found, crawling NP Blog listing pages")
+                articles = _crawl_listing_pages(
+                    scheduler, executor, base_url, max_articles, concurrency, max_pages
+                )
         
         logger.info(f"Successfully scraped {len(articles)} NP Blog articles")
         
@@ -94,64 +145,470 @@ def scrape_npblog_articles(
     return articles[:max_articles]
 
 
-def _extract_blog_posts(soup: BeautifulSoup) -> List[Article]:
-    """Extract blog post information from the soup."""
-    articles = []
+def _discover_posts(
+    scheduler: HttpScheduler,
+    executor: ThreadPoolExecutor,
+    base_url: str
+) -> Tuple[Optional[str], List["DiscoveredPost"]]:
+    """Return the discovery source URL and every post it lists, or (None, [])."""
+    parsed = urlparse(base_url)
+    origin = f"{parsed.scheme}://{parsed.netloc}"
+    # Sitemaps list the whole site; only URLs under the blog's path are posts
+    post_prefix = f"{origin}{parsed.path.rstrip('/')}/"
+    
+    api_url = f"{origin}{WP_POSTS_API_PATH}"
+    posts = _discover_from_wp_api(scheduler, executor, api_url)
+    if posts:
+        logger.info(f"Discovered {len(posts)} NP Blog posts from {api_url}")
+        return api_url, posts
+    
+    for path in SITEMAP_PATHS:
+        sitemap_url = f"{origin}{path}"
+        posts = _discover_from_sitemap(scheduler, sitemap_url, post_prefix)
+        if posts:
+            logger.info(f"Discovered {len(posts)} NP Blog posts from {sitemap_url}")
+            return sitemap_url, posts
+    
+    return None, []
+
+
+def _get(scheduler: HttpScheduler, url: str, **kwargs) -> Optional[requests.Response]:
+    """GET within the politeness limit; None when the request fails or is not a 200."""
+    try:
+        response = scheduler.get(url, timeout=10, **kwargs)
+        if response.status_code != 200:
+            logger.debug(f"{url} answered {response.status_code}")
+            return None
+        return response
+    except requests.RequestException as e:
+        logger.warning(f"Error fetching {url}: {str(e)}")
+        return None
+
+
+def _discover_from_wp_api(
+    scheduler: HttpScheduler,
+    executor: ThreadPoolExecutor,
+    api_url: str
+) -> List["DiscoveredPost"]:
+    """List every post's link and modification date from the WordPress REST API."""
+    params = {"per_page": WP_API_PAGE_SIZE, "_fields": "id,link,modified_gmt", "orderby": "modified"}
+    
+    def fetch_page(page: int) -> Optional[requests.Response]:
+        return _get(scheduler, api_url, params={**params, "page": page})
     
+    first = fetch_page(1)
+    if first is None:
+        return []
     try:
-        # Look for common blog post container patterns
-        post_selectors = [
-            "article",
-            ".post",
-            ".blog-post", 
-            ".entry",
-            "[class*='post-']",
-            ".jet-listing-item",
-            ".elementor-post",
-            ".wp-block-post"
+        pages = [first.json()]
+        total_pages = int(first.headers.get('X-WP-TotalPages', '1'))
+        for response in executor.map(fetch_page, range(2, total_pages + 1)):
+            if response is not None:
+                pages.append(response.json())
+    except ValueError as e:
+        logger.warning(f"Unusable WordPress API response from {api_url}: {str(e)}")
+        return []
+    
+    return [
+        DiscoveredPost(post["link"], post.get("modified_gmt"), post.get("id"))
+        for page in pages if isinstance(page, list)
+        for post in page if isinstance(post, dict) and post.get("link")
+    ]
+
+
+def _discover_from_sitemap(
+    scheduler: HttpScheduler,
+    sitemap_url: str,
+    post_prefix: str,
+    depth: int = 0
+) -> List["DiscoveredPost"]:
+    """
+    List the URLs under post_prefix and their lastmod dates in a sitemap,
+    following sitemap indexes into their post sitemaps when they have any.
+    """
+    response = _get(scheduler, sitemap_url)
+    if response is None:
+        return []
+    try:
+        root = etree.fromstring(response.content, etree.XMLParser(resolve_entities=False, no_network=True))
+    except etree.XMLSyntaxError as e:
+        logger.warning(f"Unreadable sitemap {sitemap_url}: {str(e)}")
+        return []
+    
+    if etree.QName(root).localname == "sitemapindex":
+        if depth >= MAX_SITEMAP_DEPTH:
+            return []
+        children = [loc.strip() for loc in root.xpath('./sm:sitemap/sm:loc/text()', namespaces=SITEMAP_NAMESPACES)]
+        # Post sitemaps (wp-sitemap-posts-post-1.xml, post-sitemap.xml) when the index names them
+        post_children = [
+            child for child in children
+            if POST_SITEMAP_PATTERN.match(urlparse(child).path.rsplit('/', 1)[-1])
         ]
-        
         posts = []
-        for selector in post_selectors:
-            found_posts = soup.select(selector)
-            if found_posts:
-                posts = found_posts
+        for child in post_children or children:
+            posts.extend(_discover_from_sitemap(scheduler, child, post_prefix, depth + 1))
+        return posts
+    
+    posts = []
+    for url_elem in root.xpath('./sm:url', namespaces=SITEMAP_NAMESPACES):
+        loc = (url_elem.findtext('sm:loc', namespaces=SITEMAP_NAMESPACES) or '').strip()
+        # The blog's own listing page is not a post
+        if loc.startswith(post_prefix) and loc.rstrip('/') != post_prefix.rstrip('/'):
+            lastmod = url_elem.findtext('sm:lastmod', namespaces=SITEMAP_NAMESPACES)
+            posts.append(DiscoveredPost(loc, lastmod.strip() if lastmod else None))
+    return posts
+
+
+def _fetch_discovered_posts(
+    scheduler: HttpScheduler,
+    executor: ThreadPoolExecutor,
+    source_url: str,
+    discovered: List["DiscoveredPost"],
+    max_articles: int,
+    force: bool,
+    dry_run: bool = False,
+    run_id: str = ""
+) -> List[Article]:
+    """Fetch the discovered posts that are new or modified since their stored lastmod."""
+    feed_cache = FeedCache()
+    feed_cache.retain_items(source_url, [post.url for post in discovered])
+    
+    # Most recently modified first, so max_articles keeps the newest changes
+    changed = [
+        post for post in sorted(discovered, key=lambda post: post.lastmod or '', reverse=True)
+        if force or not feed_cache.is_item_unchanged(source_url, post.url, post.lastmod)
+    ][:max_articles]
+    logger.info(f"{len(changed)} of {len(discovered)} NP Blog posts are new or modified")
+    
+    articles = []
+    api_posts = [post for post in changed if post.post_id is not None]
+    page_posts = [post for post in changed if post.post_id is None]
+    
+    # REST API posts in batches of full records
+    batches = [api_posts[i:i + WP_API_PAGE_SIZE] for i in range(0, len(api_posts), WP_API_PAGE_SIZE)]
+    for batch, response in zip(batches, executor.map(
+        lambda batch: _get(scheduler, source_url, params={
+            "include": ','.join(str(post.post_id) for post in batch),
+            "per_page": len(batch),
+            "_embed": "author,wp:term"
+        }),
+        batches
+    )):
+        records = {}
+        try:
+            records = {record["link"]: record for record in (response.json() if response is not None else [])}
+        except ValueError as e:
+            logger.warning(f"Unusable WordPress API response from {source_url}: {str(e)}")
+        for post in batch:
+            if post.url in records:
+                articles.append(_article_from_wp_post(records[post.url]))
+                feed_cache.record_item(source_url, post.url, post.lastmod)
+    
+    # Sitemap posts one page each
+    for post, soup in zip(page_posts, executor.map(lambda post: _fetch_page(scheduler, post.url), page_posts)):
+        article = _extract_post_page(soup, post.url) if soup is not None else None
+        if article:
+            articles.append(article)
+            feed_cache.record_item(source_url, post.url, post.lastmod)
+    
+    if not dry_run:
+        feed_cache.save(run_id)
+    return articles
+
+
+def _article_from_wp_post(record: dict) -> Article:
+    """Create an Article from a WordPress REST API post embedding its author and terms."""
+    embedded = record.get("_embedded", {})
+    authors = embedded.get("author") or [{}]
+    tags = ["npblog"]
+    for terms in embedded.get("wp:term", []):
+        for term in terms:
+            name = html.unescape(term.get("name", "")).strip().lower()
+            if name and name not in tags:
+                tags.append(name)
+    
+    date = record.get("date_gmt") or record.get("date")
+    return Article(
+        title=html.unescape(record.get("title", {}).get("rendered", "")).strip() or record["link"],
+        url=record["link"],
+        author=authors[0].get("name") or "NearPartner",
+        published_date=dateutil.parser.parse(date) if date else datetime.now(),
+        content=html_to_text(record.get("content", {}).get("rendered"), 'p', separator='\n'),
+        summary=html_to_text(record.get("excerpt", {}).get("rendered"), 'p') or None,
+        platform="npblog",
+        tags=tags,
+        additional_data={
+            "source": "nearpartner_blog",
+            "scraped_method": "wp-json",
+            "lastmod": record.get("modified_gmt")
+        }
+    )
+
+
+def _extract_post_page(soup: BeautifulSoup, url: str) -> Optional[Article]:
+    """Extract a post from its own page, using the Open Graph / article metadata WordPress emits."""
+    def meta(name: str) -> Optional[str]:
+        elem = soup.find('meta', attrs={'property': name}) or soup.find('meta', attrs={'name': name})
+        return elem.get('content') if elem else None
+    
+    title = meta('og:title') or (soup.h1.get_text(strip=True) if soup.h1 else None)
+    if not title:
+        return None
+    
+    published = meta('article:published_time')
+    if not published:
+        time_elem = soup.find('time', attrs={'datetime': True})
+        published = time_elem['datetime'] if time_elem else None
+    
+    body = soup.select_one('.entry-content, .post-content, article') or soup.body or soup
+    tags = ["npblog"]
+    for elem in soup.find_all('meta', attrs={'property': ['article:section', 'article:tag']}):
+        name = (elem.get('content') or '').strip().lower()
+        if name and name not in tags:
+            tags.append(name)
+    
+    return Article(
+        title=title,
+        url=url,
+        author=meta('author') or "NearPartner",
+        published_date=_parse_date(published) if published else datetime.now(),
+        content='\n'.join(text for text in (p.get_text(strip=True) for p in body.find_all('p')) if text),
+        summary=meta('og:description') or meta('description'),
+        platform="npblog",
+        tags=tags,
+        additional_data={
+            "source": "nearpartner_blog",
+            "scraped_method": "sitemap",
+            "lastmod": meta('article:modified_time')
+        }
+    )
+
+
+def _crawl_listing_pages(
+    scheduler: HttpScheduler,
+    executor: ThreadPoolExecutor,
+    base_url: str,
+    max_articles: int,
+    concurrency: int,
+    max_pages: int
+) -> List[Article]:
+    """Crawl the blog's listing pages from a page-ordered frontier (see scrape_npblog_articles)."""
+    articles = []
+    seen_urls = set()
+    
+    # Selectors learned on an earlier page or run of this site
+    profiles_path = Path(config.cache_dir) / PROFILES_FILE_NAME
+    site = urlparse(base_url).netloc
+    profile = dict(load_json_state(profiles_path, {}).get(site, {}))
+    saved_profile = dict(profile)
+    
+    # Frontier of (page number, listing page URL), fetched in page order
+    frontier = [(1, base_url)]
+    seen_pages = {1}
+    pages_fetched = 0
+    pattern = None
+    linked = False
+    
+    def collect(page_url: str, soup: BeautifulSoup) -> int:
+        """Keep the page's unseen articles and queue its pagination links."""
+        nonlocal linked
+        new_articles = []
+        for article in _extract_blog_posts(soup, profile):
+            if article.url not in seen_urls:
+                seen_urls.add(article.url)
+                new_articles.append(article)
+        articles.extend(new_articles)
+        
+        for page, link in _pagination_links(soup, page_url, base_url):
+            linked = True
+            if page not in seen_pages and page <= max_pages:
+                seen_pages.add(page)
+                heapq.heappush(frontier, (page, link))
+        return len(new_articles)
+    
+    while len(articles) < max_articles and pages_fetched < max_pages:
+        if not frontier:
+            next_page = max(seen_pages) + 1
+            if linked or next_page > max_pages:
+                # Pagination links, once found, list every page there is
                 break
+            if pattern is None:
+                # The blog links no further pages: find its pagination layout once
+                pattern, page_url, soup = _probe_pagination(scheduler, base_url, next_page, seen_urls, profile)
+                pages_fetched += 1
+                seen_pages.add(next_page)
+                if pattern is None or not collect(page_url, soup):
+                    logger.info(f"No new articles found on page {next_page}, stopping pagination")
+                    break
+                logger.info(f"Paginating NP Blog with {pattern}")
+                continue
+            for page in range(next_page, min(next_page + concurrency, max_pages + 1)):
+                seen_pages.add(page)
+                heapq.heappush(frontier, (page, _page_url(pattern, base_url, page)))
         
-        if not posts:
-            # Fallback: look for any container with typical blog post elements
-            posts = soup.find_all(['div', 'article'], class_=re.compile(r'.*(post|article|blog|entry).*', re.I))
+        batch = [heapq.heappop(frontier) for _ in range(min(concurrency, len(frontier), max_pages - pages_fetched))]
+        pages_fetched += len(batch)
+        soups = executor.map(lambda entry: _fetch_page(scheduler, entry[1]), batch)
+        
+        stop = False
+        for (page, page_url), soup in zip(batch, soups):
+            found = collect(page_url, soup) if soup is not None else 0
+            if not found:
+                # Early stop: later pages of a paginated archive hold nothing newer
+                logger.info(f"No new articles found on page {page}, stopping pagination")
+                stop = True
+                break
+            logger.info(f"Found {found} new articles on page {page}")
+        if stop:
+            break
+    
+    if profile and profile != saved_profile:
+        profiles = load_json_state(profiles_path, {})
+        profiles[site] = profile
+        save_json_state(profiles_path, profiles)
+    
+    logger.info(f"Crawled {pages_fetched} NP Blog listing pages")
+    return articles
+
+
+def _fetch_page(scheduler: HttpScheduler, url: str) -> Optional[BeautifulSoup]:
+    """Fetch and parse one listing page; None when the request fails."""
+    try:
+        logger.info(f"Fetching {url}")
+        response = scheduler.get(url, timeout=10)
+        response.raise_for_status()
+        return BeautifulSoup(response.content, 'html.parser')
+    except requests.RequestException as e:
+        logger.warning(f"Error fetching {url}: {str(e)}")
+        return None
+
+
+def _page_url(pattern: str, base_url: str, page: int) -> str:
+    return pattern.format(base=base_url.rstrip('/'), raw=base_url, page=page)
+
+
+def _probe_pagination(
+    scheduler: HttpScheduler,
+    base_url: str,
+    page: int,
+    seen_urls: set,
+    profile: dict
+) -> Tuple[Optional[str], Optional[str], Optional[BeautifulSoup]]:
+    """Try each pagination layout for `page`; return the first that lists unseen articles."""
+    for pattern in PAGINATION_PATTERNS:
+        url = _page_url(pattern, base_url, page)
+        soup = _fetch_page(scheduler, url)
+        if soup is not None and any(article.url not in seen_urls for article in _extract_blog_posts(soup, profile)):
+            return pattern, url, soup
+    return None, None, None
+
+
+def _pagination_links(soup: BeautifulSoup, page_url: str, base_url: str) -> List[Tuple[int, str]]:
+    """Return (page number, absolute URL) of the blog's listing pages linked from a page."""
+    base = urlparse(base_url)
+    base_path = base.path.rstrip('/')
+    links = []
+    for link in soup.select('a[href]'):
+        url = urljoin(page_url, link['href'])
+        parsed = urlparse(url)
+        if parsed.netloc != base.netloc or not parsed.path.startswith(base_path):
+            continue
+        match = PAGINATION_LINK_PATTERN.search(f"{parsed.path}?{parsed.query}")
+        if match:
+            links.append((int(match.group(1)), url.split('#', 1)[0]))
+    return links
+
+
+def _extract_blog_posts(soup: BeautifulSoup, profile: Optional[dict] = None) -> List[Article]:
+    """
+    Extract blog post information from the soup.
+    
+    Only the selectors of the site profile are used. When there is no profile
+    yet, or it no longer finds titled posts on the page, every candidate
+    selector is probed and the profile is relearned in place.
+    """
+    articles = []
+    if profile is None:
+        profile = {}
+    
+    try:
+        posts = _select_posts(soup, profile) if profile else []
+        if not profile.get("title") or not any(post.select_one(profile["title"]) for post in posts):
+            if profile:
+                logger.info("Selector profile no longer matches, probing all selectors")
+            profile.clear()
+            profile.update(_learn_profile(soup))
+            posts = _select_posts(soup, profile)
         
         for post in posts:
             try:
-                article = _extract_single_post(post)
+                article = _extract_single_post(post, profile)
                 if article:
                     articles.append(article)
             except Exception as e:
                 logger.error(f"Error extracting individual post: {str(e)}")
                 continue
-                
+    
     except Exception as e:
         logger.error(f"Error extracting blog posts: {str(e)}")
     
     return articles
 
 
-def _extract_single_post(post_element) -> Optional[Article]:
-    """Extract a single blog post from its HTML element."""
+def _select_posts(soup: BeautifulSoup, profile: dict) -> list:
+    """Find the post containers of a page with the profiled selector."""
+    if profile.get("post"):
+        return soup.select(profile["post"])
+    # Fallback: look for any container with typical blog post elements
+    return soup.find_all(['div', 'article'], class_=re.compile(r'.*(post|article|blog|entry).*', re.I))
+
+
+def _learn_profile(soup: BeautifulSoup) -> dict:
+    """
+    Probe every candidate selector on a page and keep, per field, the one
+    matching the most posts (earlier candidates win ties). Fields no
+    candidate matches are recorded as None so they are not probed again.
+    """
+    profile = {"post": None}
+    for selector in SELECTOR_CANDIDATES["post"]:
+        if soup.select_one(selector):
+            profile["post"] = selector
+            break
+    posts = _select_posts(soup, profile)
+    
+    for field in ("title", "date", "content", "author"):
+        candidates = SELECTOR_CANDIDATES[field]
+        counts = [sum(1 for post in posts if post.select_one(selector)) for selector in candidates]
+        best = max(range(len(candidates)), key=lambda index: (counts[index], -index))
+        profile[field] = candidates[best] if counts[best] else None
+    
+    # Categories are collected from every matching selector, not just the first
+    profile["category"] = [
+        selector for selector in SELECTOR_CANDIDATES["category"]
+        if any(post.select_one(selector) for post in posts)
+    ]
+    
+    logger.info(f"Learned selector profile: {profile}")
+    return profile
+
+
+def _select_field(post_element, profile: dict, field: str):
+    selector = profile.get(field)
+    return post_element.select_one(selector) if selector else None
+
+
+def _extract_single_post(post_element, profile: dict) -> Optional[Article]:
+    """Extract a single blog post from its HTML element using the site's selector profile."""
     try:
         # Extract title
-        title_selectors = ['h1', 'h2', 'h3', '.title', '.post-title', '.entry-title', '[class*="title"]']
         title = None
-        for selector in title_selectors:
-            title_elem = post_element.select_one(selector)
-            if title_elem:
-                title = title_elem.get_text(strip=True)
-                break
+        title_elem = _select_field(post_element, profile, "title")
+        if title_elem:
+            title = title_elem.get_text(strip=True)
         
         if not title:
             return None
-            
+        
         # Extract URL
         url = None
         link_elem = post_element.select_one('a[href]')
@@ -170,50 +627,34 @@ def _extract_single_post(post_element) -> Optional[Article]:
             url = f"https://www.nearpartner.com/blog/{title.lower().replace(' ', '-')}"
         
         # Extract date
-        date_selectors = ['.date', '.published', '.post-date', '.entry-date', 'time', '[class*="date"]']
         published_date = None
-        for selector in date_selectors:
-            date_elem = post_element.select_one(selector)
-            if date_elem:
-                date_text = date_elem.get_text(strip=True)
-                try:
-                    # Try to parse different date formats
-                    published_date = _parse_date(date_text)
-                    break
-                except:
-                    continue
+        date_elem = _select_field(post_element, profile, "date")
+        if date_elem:
+            # Try to parse different date formats
+            published_date = _parse_date(date_elem.get_text(strip=True))
         
         if not published_date:
             published_date = datetime.now()
         
         # Extract content/excerpt
-        content_selectors = ['.excerpt', '.summary', '.content', '.entry-content', '.post-content', 'p']
         content = ""
-        for selector in content_selectors:
-            content_elem = post_element.select_one(selector)
-            if content_elem:
-                content = content_elem.get_text(strip=True)[:500]  # Limit content length
-                break
+        content_elem = _select_field(post_element, profile, "content")
+        if content_elem:
+            content = content_elem.get_text(strip=True)[:500]  # Limit content length
         
         # Extract author
-        author_selectors = ['.author', '.by-author', '.post-author', '[class*="author"]']
         author = "NearPartner"  # Default
-        for selector in author_selectors:
-            author_elem = post_element.select_one(selector)
-            if author_elem:
-                author = author_elem.get_text(strip=True)
-                break
+        author_elem = _select_field(post_element, profile, "author")
+        if author_elem:
+            author = author_elem.get_text(strip=True)
         
         # Extract categories/tags
-        category_selectors = ['.category', '.categories', '.tags', '.post-category', '[class*="categor"]']
         tags = ["npblog"]  # Default tag
-        for selector in category_selectors:
-            category_elems = post_element.select(selector)
-            if category_elems:
-                for cat_elem in category_elems:
-                    cat_text = cat_elem.get_text(strip=True)
-                    if cat_text and cat_text not in tags:
-                        tags.append(cat_text.lower())
+        for selector in profile.get("category", []):
+            for cat_elem in post_element.select(selector):
+                cat_text = cat_elem.get_text(strip=True)
+                if cat_text and cat_text not in tags:
+                    tags.append(cat_text.lower())
         
         # Create Article object
         article = Article(
@@ -231,7 +672,7 @@ def _extract_single_post(post_element) -> Optional[Article]:
         )
         
         return article
-        
+    
     except Exception as e:
         logger.error(f"Error extracting single post: {str(e)}")
         return None
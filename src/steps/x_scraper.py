@@ -1,25 +1,64 @@
 from zenml import step
-from typing import List, Optional
-import json
+from typing import List, Optional, Tuple
+import gc
+import io
+import os
 import re
+import json
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
 import logging
+from pymongo import MongoClient
 from src.models import Article
+from src.utils.export_archive import ExportFS, ExportEntry
+from src.utils.json_stream import iter_json_array
+from src.utils.export_manifest import ExportManifest
 
 logger = logging.getLogger(__name__)
 
+# Tweet files of an X archive: tweets.js, then tweets-part1.js, tweets-part2.js, ...
+TWEET_PART_PATTERN = re.compile(r'^tweets(?:-part(\d+))?\.js$')
+
+# Where tweet parts and manifest.js live: the given directory itself, or the
+# data/ folder of a full archive
+ARCHIVE_DATA_DIR = "data"
+
 @step
 def scrape_x_tweets(
     x_data_path: str = "/home/na/DEV/twin/data/X",
-    max_tweets: int = 10000
+    max_tweets: int = 10000,
+    force: bool = False,
+    workers: int = 1,
+    run_id: str = "",
+    connection_string: str = None,
+    database_name: str = None,
+    collection_name: str = None
 ) -> List[Article]:
     """
-    Scrapes X (Twitter) tweets from JavaScript export file.
+    Scrapes X (Twitter) tweets from JavaScript export files.
+    
+    Large archives split tweets across tweets.js, tweets-part1.js, ...; every
+    part is found (through the archive's manifest.js when present), decoded
+    concurrently and merged by tweet id, dropping duplicates across parts.
+    Every tweet is then placed in its reply thread (conversation_id and
+    conversation_depth in additional_data); replies to tweets outside the
+    batch continue the thread their parent was stored in.
     
     Args:
-        x_data_path: Path to X data directory containing tweets.js
+        x_data_path: Path to X data directory containing tweets.js, or the
+            downloaded archive .zip (tweets.js is read from its data/ folder)
         max_tweets: Maximum number of tweets to process
+        force: Re-process tweet files even if the export manifest says they
+            were already ingested unchanged
+        workers: Number of processes used to decode tweet parts concurrently
+            (1 decodes serially, 0 or less uses every available core)
+        run_id: Pipeline run whose storage step commits the export manifest
+            updates; without one they are saved right away
+        connection_string: MongoDB connection string used to look up stored parents
+        database_name: MongoDB database name
+        collection_name: MongoDB collection name
     
     Returns:
         List of Article objects containing X tweets
@@ -28,45 +67,47 @@ def scrape_x_tweets(
     
     try:
         x_path = Path(x_data_path)
-        tweets_file = x_path / "tweets.js"
+        tweet_parts = _find_tweet_parts(ExportFS(x_path))
         
-        if not tweets_file.exists():
-            logger.warning(f"X tweets file does not exist: {tweets_file}")
+        if not tweet_parts:
+            logger.warning(f"X tweets file does not exist in: {x_path}")
             return articles
 
-        # Read the tweets.js file
-        with open(tweets_file, 'r', encoding='utf-8') as f:
-            content = f.read()
+        # Skip parts that were fully ingested on a previous run
+        manifest = None if force else ExportManifest()
+        if manifest:
+            unchanged = {part for part in tweet_parts if manifest.is_unchanged(part)}
+            for part in tweet_parts:
+                if part in unchanged:
+                    logger.info(f"Skipping {part.name}, already ingested")
+            tweet_parts = [part for part in tweet_parts if part not in unchanged]
+
+        # Merge parts in archive order, keeping the first copy of each tweet
+        articles_by_id = {}
+        duplicates = 0
+        for part, (part_articles, complete) in zip(tweet_parts, _run_tweet_parts(tweet_parts, max_tweets, workers)):
+            for article in part_articles:
+                tweet_id = article.additional_data["tweet_id"]
+                if tweet_id in articles_by_id:
+                    duplicates += 1
+                elif len(articles_by_id) >= max_tweets:
+                    complete = False
+                    break
+                else:
+                    articles_by_id[tweet_id] = article
+            
+            if manifest and complete:
+                manifest.record(part)
         
-        # Extract JSON data from JavaScript format
-        # The file starts with "window.YTD.tweets.part0 = " followed by JSON
-        json_match = re.search(r'window\.YTD\.tweets\.part0\s*=\s*(\[.*\])', content, re.DOTALL)
-        if not json_match:
-            logger.error("Could not extract JSON data from tweets.js file")
-            return articles
+        articles = list(articles_by_id.values())
+        stored_parents = _stored_conversations(articles_by_id, connection_string, database_name, collection_name)
+        _assign_conversations(articles, stored_parents)
+        if duplicates:
+            logger.info(f"Dropped {duplicates} tweets duplicated across archive parts")
+        logger.info(f"Successfully processed {len(articles)} X tweets from {len(tweet_parts)} files")
         
-        json_data = json_match.group(1)
-        tweets_data = json.loads(json_data)
-        
-        logger.info(f"Found {len(tweets_data)} tweets in the export file")
-        
-        # Process tweets
-        processed_count = 0
-        for tweet_entry in tweets_data:
-            if processed_count >= max_tweets:
-                break
-                
-            try:
-                tweet = tweet_entry.get('tweet', {})
-                article = _extract_tweet_data(tweet)
-                if article:
-                    articles.append(article)
-                    processed_count += 1
-            except Exception as e:
-                logger.error(f"Error processing individual tweet: {str(e)}")
-                continue
-        
-        logger.info(f"Successfully processed {len(articles)} X tweets")
+        if manifest:
+            manifest.save(run_id)
         
     except Exception as e:
         logger.error(f"Error scraping X tweets: {str(e)}")
@@ -74,6 +115,198 @@ def scrape_x_tweets(
     return articles[:max_tweets]
 
 
+def _stored_conversations(
+    articles_by_id: dict,
+    connection_string: str,
+    database_name: str,
+    collection_name: str
+) -> dict:
+    """
+    Load the conversation of every stored tweet that a tweet of the batch
+    replies to from outside it (ingested on an earlier run, or cut by
+    max_tweets), with one query on the URL index.
+    Returns {tweet_id: (conversation_id, conversation_depth)}.
+    """
+    parent_ids = {
+        article.additional_data.get("reply_to_status_id") for article in articles_by_id.values()
+    } - set(articles_by_id) - {None}
+    if not parent_ids:
+        return {}
+    
+    connection_string = connection_string or os.getenv('MONGO_CONNECTION_STRING', 'mongodb://localhost:27017/')
+    database_name = database_name or os.getenv('MONGO_DATABASE', 'publications_db')
+    collection_name = collection_name or os.getenv('MONGO_COLLECTION', 'articles')
+    
+    try:
+        client = MongoClient(connection_string)
+        collection = client[database_name][collection_name]
+        stored = {}
+        for document in collection.find(
+            {"url": {"$in": [_tweet_url(parent_id) for parent_id in parent_ids]}},
+            {"additional_data.tweet_id": 1, "additional_data.conversation_id": 1,
+             "additional_data.conversation_depth": 1, "_id": 0}
+        ):
+            data = document.get("additional_data", {})
+            if data.get("tweet_id") and data.get("conversation_id"):
+                stored[data["tweet_id"]] = (data["conversation_id"], data.get("conversation_depth", 0))
+        client.close()
+    except Exception as e:
+        logger.warning(f"Could not load stored reply parents, threading within the batch only: {str(e)}")
+        return {}
+    
+    return stored
+
+
+def _assign_conversations(articles: List[Article], stored_parents: Optional[dict] = None):
+    """
+    Set conversation_id and conversation_depth on every tweet in one pass.
+    
+    A map from parent to replies is built over the batch and walked from each
+    thread's top: a standalone tweet starts its own conversation (depth 0),
+    a reply to a stored tweet (stored_parents, from _stored_conversations)
+    continues that tweet's conversation one level deeper, and a reply to any
+    other tweet outside the batch (e.g. someone else's) is grouped under the
+    parent's id at depth 1. A whole thread can then be fetched with a single
+    indexed query on conversation_id.
+    """
+    stored_parents = stored_parents or {}
+    by_id = {article.additional_data["tweet_id"]: article.additional_data for article in articles}
+    replies = defaultdict(list)
+    tops = []
+    for tweet_id, data in by_id.items():
+        parent_id = data.get("reply_to_status_id")
+        if parent_id in by_id and parent_id != tweet_id:
+            replies[parent_id].append(tweet_id)
+        else:
+            tops.append(tweet_id)
+    
+    for top_id in tops:
+        parent_id = by_id[top_id].get("reply_to_status_id")
+        if parent_id in stored_parents:
+            conversation_id, parent_depth = stored_parents[parent_id]
+            pending = [(top_id, parent_depth + 1)]
+        else:
+            conversation_id = parent_id or top_id
+            pending = [(top_id, 1 if parent_id else 0)]
+        while pending:
+            tweet_id, depth = pending.pop()
+            by_id[tweet_id]["conversation_id"] = conversation_id
+            by_id[tweet_id]["conversation_depth"] = depth
+            pending.extend((reply_id, depth + 1) for reply_id in replies.get(tweet_id, ()))
+    
+    # Reply loops have no top to start from; keep each tweet on its own
+    for tweet_id, data in by_id.items():
+        if "conversation_id" not in data:
+            data["conversation_id"] = tweet_id
+            data["conversation_depth"] = 0
+
+
+def _tweet_url(tweet_id: str) -> str:
+    return f"https://x.com/nelsonandre_/status/{tweet_id}"
+
+
+def _find_tweet_parts(export_fs: ExportFS) -> List[ExportEntry]:
+    """
+    List the archive's tweet files in order, from manifest.js when it exists
+    and otherwise by looking for tweets.js and tweets-partN.js.
+    """
+    for manifest_path in ("manifest.js", f"{ARCHIVE_DATA_DIR}/manifest.js"):
+        manifest_file = export_fs.find(manifest_path)
+        if not manifest_file:
+            continue
+        
+        file_names = _read_manifest_tweet_files(manifest_file)
+        parts = []
+        for file_name in file_names:
+            # Manifest paths are relative to the archive root ("data/tweets.js")
+            part = export_fs.find(file_name) or export_fs.find(file_name.split('/')[-1])
+            if part:
+                parts.append(part)
+            else:
+                logger.warning(f"Tweet file listed in {manifest_file.name} not found: {file_name}")
+        if parts:
+            return parts
+    
+    found = {}
+    for _, entry in export_fs.iter_files(lambda dir_parts: dir_parts == (ARCHIVE_DATA_DIR,)):
+        match = TWEET_PART_PATTERN.match(entry.name)
+        if match:
+            found.setdefault(int(match.group(1) or 0), entry)
+    return [found[number] for number in sorted(found)]
+
+
+def _read_manifest_tweet_files(manifest_file: ExportEntry) -> List[str]:
+    """Read the tweet file names from an archive's manifest.js (window.__THAR_CONFIG = {...})"""
+    try:
+        with manifest_file.open() as f:
+            content = io.TextIOWrapper(f, encoding='utf-8').read()
+        manifest = json.loads(content[content.index('{'):])
+        files = manifest["dataTypes"]["tweets"]["files"]
+        return [entry["fileName"] for entry in files if entry.get("fileName")]
+    except (ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Could not read tweet files from {manifest_file.name}: {str(e)}")
+        return []
+
+
+def _run_tweet_parts(
+    tweet_parts: List[ExportEntry],
+    max_tweets: int,
+    workers: int
+) -> List[Tuple[List[Article], bool]]:
+    """Decode every tweet part, serially or across a process pool, in part order"""
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    
+    if workers == 1 or len(tweet_parts) <= 1:
+        return [_parse_tweet_part(part, max_tweets) for part in tweet_parts]
+    
+    with ProcessPoolExecutor(max_workers=min(workers, len(tweet_parts)), initializer=_init_tweet_worker) as executor:
+        return list(executor.map(_parse_tweet_part, tweet_parts, [max_tweets] * len(tweet_parts)))
+
+
+def _parse_tweet_part(tweet_part: ExportEntry, max_tweets: int) -> Tuple[List[Article], bool]:
+    """
+    Decode up to max_tweets tweets from one part. Runs in worker processes;
+    returns the articles and whether the whole part was read.
+    """
+    articles = []
+    
+    # Stream tweets out of the "window.YTD.tweets.partN = [...]" assignment
+    # one at a time instead of loading and copying the whole payload
+    with tweet_part.open() as f:
+        tweet_entries = iter_json_array(io.TextIOWrapper(f, encoding='utf-8'))
+        try:
+            for tweet_entry in tweet_entries:
+                if len(articles) >= max_tweets:
+                    return articles, False
+                    
+                try:
+                    tweet = tweet_entry.get('tweet', {})
+                    article = _extract_tweet_data(tweet)
+                    if article:
+                        articles.append(article)
+                except Exception as e:
+                    logger.error(f"Error processing individual tweet: {str(e)}")
+                    continue
+        except ValueError as e:
+            # json.JSONDecodeError is a ValueError too
+            logger.error(f"Could not extract JSON data from {tweet_part.name}: {str(e)}")
+            return articles, False
+    
+    logger.info(f"Processed {len(articles)} tweets from {tweet_part.name}")
+    return articles, True
+
+
+def _init_tweet_worker():
+    """
+    Turn off the cyclic garbage collector in a decoding worker process.
+    Articles are acyclic, and otherwise every collection rescans all the
+    articles built so far; the process only lives for the pool, so the
+    pipeline's own process keeps its collector.
+    """
+    gc.disable()
+
+
 def _extract_tweet_data(tweet: dict) -> Optional[Article]:
     """Extract tweet data into Article format."""
     try:
@@ -114,7 +347,7 @@ def _extract_tweet_data(tweet: dict) -> Optional[Article]:
             tags.extend([f'#{tag}' for tag in hashtags[:3]])  # Limit hashtag tags
         
         # Create URL
-        url = f"https://x.com/nelsonandre_/status/{tweet_id}"
+        url = _tweet_url(tweet_id)
         
         # Determine title (first 50 chars of tweet or generate one)
         title = full_text[:50] + "..." if len(full_text) > 50 else full_text
@@ -1,3 +1,10 @@
 from .config import config, Config
+from .facebook_timestamps import FacebookTimestampParser
+from .export_archive import ExportFS, ExportEntry
+from .export_manifest import ExportManifest
+from .feed_cache import FeedCache
+from .http_cache import HttpCache
+from .http_scheduler import HttpScheduler, default_scheduler
+from .url_index import UrlIndex
 
-__all__ = ["config", "Config"]
\ No newline at end of file
+__all__ = ["config", "Config", "FacebookTimestampParser", "ExportFS", "ExportEntry", "ExportManifest", "FeedCache", "HttpCache", "HttpScheduler", "default_scheduler", "UrlIndex"]
@@ -1,5 +1,6 @@
 import os
 from dotenv import load_dotenv
+from typing import List
 from pydantic import BaseModel
 
 
@@ -12,28 +13,56 @@ class Config(BaseModel):
     mongo_connection_string: str = os.getenv('MONGO_CONNECTION_STRING', 'mongodb://localhost:27017/')
     mongo_database: str = os.getenv('MONGO_DATABASE', 'publications_db')
     mongo_collection: str = os.getenv('MONGO_COLLECTION', 'articles')
+    mongo_batch_size: int = int(os.getenv('MONGO_BATCH_SIZE', '1000'))  # upserts per bulk write
+    url_index_enabled: bool = os.getenv('URL_INDEX_ENABLED', 'true').lower() in ('true', '1', 'yes')  # local index of stored URLs
     
     # LinkedIn Configuration (removed)
     
     # Medium Configuration  
     medium_username: str = os.getenv('MEDIUM_USERNAME', '')
+    medium_feeds: List[str] = [
+        feed.strip() for feed in os.getenv('MEDIUM_FEEDS', '').split(',') if feed.strip()
+    ]  # "@username" for users, bare name for publications
+    medium_concurrency: int = int(os.getenv('MEDIUM_CONCURRENCY', '4'))  # feeds / posts fetched at once
+    medium_full_articles: bool = os.getenv('MEDIUM_FULL_ARTICLES', 'false').lower() in ('true', '1', 'yes')
+    medium_retries: int = int(os.getenv('MEDIUM_RETRIES', '3'))
+    medium_base_url: str = os.getenv('MEDIUM_BASE_URL', 'https://medium.com')
     
     # Facebook Configuration
     facebook_data_path: str = os.getenv('FACEBOOK_DATA_PATH', '/home/na/DEV/twin/data/Facebook')
     include_facebook: bool = os.getenv('INCLUDE_FACEBOOK', 'true').lower() in ('true', '1', 'yes')
+    facebook_workers: int = int(os.getenv('FACEBOOK_WORKERS', '1'))  # 0 = one per CPU core
+    facebook_activities: List[str] = [
+        activity.strip() for activity in os.getenv('FACEBOOK_ACTIVITIES', 'posts').split(',') if activity.strip()
+    ]  # posts, comments, reactions, messages, inbox, ads, security, root
+    facebook_parser_backend: str = os.getenv('FACEBOOK_PARSER_BACKEND', 'html.parser')  # html.parser or lxml
     include_medium: bool = os.getenv('INCLUDE_MEDIUM', 'true').lower() in ('true', '1', 'yes')
     
     # NP Blog Configuration
     npblog_url: str = os.getenv('NPBLOG_URL', 'https://www.nearpartner.com/blog/')
     include_npblog: bool = os.getenv('INCLUDE_NPBLOG', 'true').lower() in ('true', '1', 'yes')
+    npblog_concurrency: int = int(os.getenv('NPBLOG_CONCURRENCY', '4'))  # listing pages fetched at once
     
     # X (Twitter) Configuration
     x_data_path: str = os.getenv('X_DATA_PATH', '/home/na/DEV/twin/data/X')
     include_x: bool = os.getenv('INCLUDE_X', 'true').lower() in ('true', '1', 'yes')
+    x_workers: int = int(os.getenv('X_WORKERS', '1'))  # 0 = one per CPU core
     
     # Scraping Configuration
     max_articles_per_platform: int = int(os.getenv('MAX_ARTICLES_PER_PLATFORM', '10000'))
-    scraping_delay_seconds: int = int(os.getenv('SCRAPING_DELAY_SECONDS', '2'))
+    scraping_delay_seconds: int = int(os.getenv('SCRAPING_DELAY_SECONDS', '2'))  # first retry backoff
+    
+    # Shared HTTP scheduler (all scrapers in a run share these limits)
+    http_requests_per_second: float = float(os.getenv('HTTP_REQUESTS_PER_SECOND', '4'))  # per host
+    http_burst: int = int(os.getenv('HTTP_BURST', '4'))  # requests a host may receive back to back
+    http_max_concurrency: int = int(os.getenv('HTTP_MAX_CONCURRENCY', '8'))  # in flight across all hosts
+    http_retries: int = int(os.getenv('HTTP_RETRIES', '3'))
+    http_cache_mode: str = os.getenv('HTTP_CACHE_MODE', 'off')  # off, on or replay (cache only, no network)
+    http_cache_ttl_seconds: int = int(os.getenv('HTTP_CACHE_TTL_SECONDS', '3600'))  # then revalidated
+    http_cache_max_mb: int = int(os.getenv('HTTP_CACHE_MAX_MB', '512'))  # least recently used evicted beyond
+    
+    # Local state (export manifest, caches)
+    cache_dir: str = os.getenv('CACHE_DIR', '.cache')
 
 
 # Global config instance
@@ -0,0 +1,152 @@
+import os
+import time
+import zipfile
+import logging
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Callable, Dict, Iterator, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SUFFIX = ".zip"
+
+
+class ExportEntry(NamedTuple):
+    """
+    One file of a data export: a file on disk, or a member of a zip archive.
+
+    Entries are plain tuples so they can be handed to worker processes, which
+    open archives themselves.
+    """
+    path: str
+    member: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        return PurePosixPath(self.member).name if self.member else Path(self.path).name
+
+    @property
+    def suffix(self) -> str:
+        return PurePosixPath(self.name).suffix
+
+    @property
+    def key(self) -> str:
+        """Stable identifier, used e.g. by the export manifest"""
+        resolved = str(Path(self.path).resolve())
+        return f"{resolved}::{self.member}" if self.member else resolved
+
+    @contextmanager
+    def open(self) -> Iterator[BinaryIO]:
+        """Open the entry for binary reading; archive members are decompressed on the fly."""
+        if self.member is None:
+            with open(self.path, 'rb') as f:
+                yield f
+        else:
+            with _open_archive(self.path, os.getpid()).open(self.member) as f:
+                yield f
+
+    def stat(self) -> Tuple[int, float]:
+        """Return the (uncompressed) size and modification time of the entry."""
+        if self.member is None:
+            stat = os.stat(self.path)
+            return stat.st_size, stat.st_mtime
+        info = self.zip_info()
+        return info.file_size, time.mktime(info.date_time + (0, 0, -1))
+
+    def zip_info(self) -> zipfile.ZipInfo:
+        return _open_archive(self.path, os.getpid()).getinfo(self.member)
+
+
+class ExportFS:
+    """
+    Read-only view of a data export as a single tree of relative paths.
+
+    The root may be an extracted export directory, a downloaded `.zip`, or a
+    directory holding the zip parts an export was split into (each part holds
+    a share of the tree). Zip members are read straight from the archive, so
+    nothing has to be extracted first; files extracted on disk take precedence
+    over archive members with the same path.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.archives = []
+        if self.root.is_file() and self.root.suffix.lower() == ARCHIVE_SUFFIX:
+            self.archives = [self.root]
+        elif self.root.is_dir():
+            self.archives = sorted(
+                path for path in self.root.iterdir()
+                if path.is_file() and path.suffix.lower() == ARCHIVE_SUFFIX
+            )
+        self._members = self._index_archives()
+
+    def exists(self) -> bool:
+        return self.root.exists()
+
+    def _index_archives(self) -> Dict[str, ExportEntry]:
+        """Map the relative path of every archive member to its entry, first part wins."""
+        members = {}
+        for archive_path in self.archives:
+            try:
+                archive = _open_archive(str(archive_path), os.getpid())
+            except (OSError, zipfile.BadZipFile) as e:
+                logger.warning(f"Skipping unreadable export archive {archive_path.name}: {str(e)}")
+                continue
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                rel_path = str(PurePosixPath(info.filename))
+                members.setdefault(rel_path, ExportEntry(str(archive_path), info.filename))
+            logger.info(f"Reading export archive {archive_path.name} ({len(archive.infolist())} members)")
+        return members
+
+    def iter_files(
+        self,
+        include_dir: Optional[Callable[[tuple], bool]] = None
+    ) -> Iterator[Tuple[str, ExportEntry]]:
+        """
+        Yield (relative posix path, entry) for every file in the export.
+
+        include_dir is called with a directory's relative path parts; files
+        below directories it rejects are not listed, and on disk those
+        directories are not descended into.
+        """
+        seen = set()
+        archive_names = {path.name for path in self.archives}
+        if self.root.is_dir():
+            for dir_path, dir_names, file_names in os.walk(self.root):
+                rel_dir = Path(dir_path).relative_to(self.root).parts
+                if include_dir:
+                    dir_names[:] = [name for name in dir_names if include_dir(rel_dir + (name,))]
+                for file_name in file_names:
+                    if not rel_dir and file_name in archive_names:
+                        continue
+                    rel_path = '/'.join(rel_dir + (file_name,))
+                    seen.add(rel_path)
+                    yield rel_path, ExportEntry(os.path.join(dir_path, file_name))
+
+        for rel_path, entry in self._members.items():
+            if rel_path in seen:
+                continue
+            dir_parts = PurePosixPath(rel_path).parts[:-1]
+            if include_dir and not all(include_dir(dir_parts[:depth]) for depth in range(1, len(dir_parts) + 1)):
+                continue
+            yield rel_path, entry
+
+    def find(self, rel_path: str) -> Optional[ExportEntry]:
+        """Return the entry at a relative path, or None if the export has no such file."""
+        if self.root.is_dir():
+            file_path = self.root / rel_path
+            if file_path.is_file():
+                return ExportEntry(str(file_path))
+        return self._members.get(rel_path)
+
+
+@lru_cache(maxsize=16)
+def _open_archive(path: str, pid: int) -> zipfile.ZipFile:
+    """
+    Open an archive once per process. Keyed by pid so forked workers never
+    share a file position with their parent.
+    """
+    return zipfile.ZipFile(path)
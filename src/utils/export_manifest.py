@@ -0,0 +1,121 @@
+import hashlib
+import logging
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+from .config import config
+from .export_archive import ExportEntry
+from .json_state import load_json_state
+from .pending_state import save_json_entries
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE_NAME = "export_manifest.json"
+
+# Bytes read at a time when hashing export files
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class ExportManifest:
+    """
+    Fingerprints of export files that have already been fully ingested.
+    
+    Entries are keyed by absolute path and record size, mtime and a SHA-256
+    of the content. A file whose size and mtime still match is treated as
+    unchanged without being read; when only the mtime moved (e.g. the export
+    was extracted again) the content hash decides. Members of zip archives
+    are keyed by archive path and member name and use the CRC-32 stored in
+    the archive instead of a hash, so they are never decompressed to check.
+    
+    Files only partly ingested (cut short by max_items) record a checkpoint
+    instead of a fingerprint: the byte offset of the first section not yet
+    ingested, valid while the file's size and mtime do not change.
+    
+    Within a pipeline run, save(run_id) stages the entries, and the storage
+    step commits them once the run's articles are stored, so files whose
+    articles failed to store are read again on the next run.
+    """
+    
+    def __init__(self, manifest_path: Optional[str] = None):
+        self.path = Path(manifest_path or Path(config.cache_dir) / MANIFEST_FILE_NAME)
+        self._entries = load_json_state(self.path, {})
+        self._updated = set()
+    
+    def is_unchanged(self, file_path: Union[Path, ExportEntry]) -> bool:
+        """Return True if file_path was ingested before and has not changed since."""
+        source = _as_entry(file_path)
+        entry = self._entries.get(source.key)
+        if not entry or 'checkpoint' in entry:
+            return False
+        
+        size, mtime = source.stat()
+        if size != entry['size']:
+            return False
+        if mtime == entry['mtime']:
+            return True
+        
+        field, digest = _content_digest(source)
+        if entry.get(field) != digest:
+            return False
+        
+        # Same content under a new mtime; remember it so the next check is cheap
+        entry['mtime'] = mtime
+        self._updated.add(source.key)
+        return True
+    
+    def record(self, file_path: Union[Path, ExportEntry]):
+        """Mark file_path as fully ingested in its current state."""
+        source = _as_entry(file_path)
+        size, mtime = source.stat()
+        field, digest = _content_digest(source)
+        self._entries[source.key] = {
+            'size': size,
+            'mtime': mtime,
+            field: digest
+        }
+        self._updated.add(source.key)
+    
+    def checkpoint(self, file_path: Union[Path, ExportEntry]) -> int:
+        """Return the offset to resume a partly ingested file from, or 0."""
+        source = _as_entry(file_path)
+        entry = self._entries.get(source.key)
+        if not entry or 'checkpoint' not in entry:
+            return 0
+        return entry['checkpoint'] if (entry['size'], entry['mtime']) == source.stat() else 0
+    
+    def record_checkpoint(self, file_path: Union[Path, ExportEntry], offset: int):
+        """Mark file_path as ingested up to offset."""
+        source = _as_entry(file_path)
+        size, mtime = source.stat()
+        self._entries[source.key] = {
+            'size': size,
+            'mtime': mtime,
+            'checkpoint': offset
+        }
+        self._updated.add(source.key)
+    
+    def save(self, run_id: str = ""):
+        """Persist entries changed by this instance; see save_json_entries."""
+        if not self._updated:
+            return
+        
+        merged = save_json_entries(self.path, {key: self._entries[key] for key in self._updated}, run_id)
+        if merged is not None:
+            self._entries = merged
+        self._updated.clear()
+
+
+def _as_entry(file_path: Union[Path, ExportEntry]) -> ExportEntry:
+    return file_path if isinstance(file_path, ExportEntry) else ExportEntry(str(file_path))
+
+
+def _content_digest(source: ExportEntry) -> Tuple[str, str]:
+    """Return the manifest field and value identifying the entry's content."""
+    if source.member:
+        return 'crc32', f"{source.zip_info().CRC:08x}"
+    
+    digest = hashlib.sha256()
+    with source.open() as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return 'sha256', digest.hexdigest()
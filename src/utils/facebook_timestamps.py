@@ -0,0 +1,138 @@
+import re
+import logging
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Month names and day-period phrases seen in Facebook exports, per locale.
+# Keys are lowercase; month abbreviations may also appear with a trailing dot.
+LOCALES = {
+    "pt": {
+        "months": {
+            "jan": 1, "fev": 2, "mar": 3, "abr": 4, "mai": 5, "jun": 6,
+            "jul": 7, "ago": 8, "set": 9, "out": 10, "nov": 11, "dez": 12,
+            "janeiro": 1, "fevereiro": 2, "março": 3, "abril": 4, "maio": 5, "junho": 6,
+            "julho": 7, "agosto": 8, "setembro": 9, "outubro": 10, "novembro": 11, "dezembro": 12
+        },
+        "meridiems": {
+            "da manhã": "AM", "da madrugada": "AM", "da tarde": "PM", "da noite": "PM"
+        }
+    },
+    "en": {
+        "months": {
+            "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+            "jul": 7, "aug": 8, "sep": 9, "sept": 9, "oct": 10, "nov": 11, "dec": 12,
+            "january": 1, "february": 2, "march": 3, "april": 4, "june": 6,
+            "july": 7, "august": 8, "september": 9, "october": 10, "november": 11, "december": 12
+        },
+        "meridiems": {
+            "am": "AM", "pm": "PM", "a.m.": "AM", "p.m.": "PM"
+        }
+    },
+    "es": {
+        "months": {
+            "ene": 1, "feb": 2, "mar": 3, "abr": 4, "may": 5, "jun": 6,
+            "jul": 7, "ago": 8, "sep": 9, "sept": 9, "oct": 10, "nov": 11, "dic": 12,
+            "enero": 1, "febrero": 2, "marzo": 3, "abril": 4, "mayo": 5, "junio": 6,
+            "julio": 7, "agosto": 8, "septiembre": 9, "octubre": 10, "noviembre": 11, "diciembre": 12
+        },
+        "meridiems": {
+            "a. m.": "AM", "p. m.": "PM", "a.m.": "AM", "p.m.": "PM",
+            "de la mañana": "AM", "de la madrugada": "AM", "de la tarde": "PM", "de la noche": "PM"
+        }
+    }
+}
+
+_TIME = r"(?P<hour>\d{1,2}):(?P<minute>\d{2})(?::(?P<second>\d{2}))?(?: (?P<meridiem>.+))?"
+
+# Layouts Facebook uses, e.g. "Jun 03, 2025 10:53:49 da tarde" and "3 de junio de 2025 10:53 p. m."
+FORMATS = {
+    "month_first": re.compile(
+        r"^(?P<month>[^\W\d_]+)\.? (?P<day>\d{1,2}),? (?P<year>\d{4}),?(?: at)? " + _TIME + r"$"
+    ),
+    "day_first": re.compile(
+        r"^(?P<day>\d{1,2})(?: de)? (?P<month>[^\W\d_]+)\.?(?: de)? (?P<year>\d{4}),?(?: às| a las| at)? " + _TIME + r"$"
+    )
+}
+
+
+class FacebookTimestampParser:
+    """
+    Parses the human-readable timestamps found in Facebook HTML exports.
+
+    An export is written in a single locale and layout, so the first timestamp
+    that parses fixes both and later calls try that combination first. Full
+    probing across all locales and layouts only happens for strings that do
+    not match. Results are memoized, since the same timestamp often appears
+    in several sections.
+    """
+
+    def __init__(self, cache_size: int = 4096):
+        self.locale: Optional[str] = None
+        self.layout: Optional[str] = None
+        self._cached_parse = lru_cache(maxsize=cache_size)(self._parse)
+
+    def parse(self, timestamp_text: str) -> Optional[datetime]:
+        """Return the parsed timestamp, or None when it is empty or not recognised"""
+        if not timestamp_text:
+            return None
+        return self._cached_parse(timestamp_text)
+
+    def _parse(self, timestamp_text: str) -> Optional[datetime]:
+        # Collapse non-breaking and repeated spaces so the patterns stay simple
+        text = ' '.join(timestamp_text.split())
+        if not text:
+            return None
+
+        if self.layout:
+            result = _match(text, FORMATS[self.layout], LOCALES[self.locale])
+            if result:
+                return result
+
+        for layout, pattern in FORMATS.items():
+            for locale, tables in LOCALES.items():
+                result = _match(text, pattern, tables)
+                if result:
+                    if not self.layout:
+                        self.layout, self.locale = layout, locale
+                        logger.debug(f"Detected Facebook timestamp format: {layout} ({locale})")
+                    return result
+
+        logger.debug(f"Could not parse timestamp: {text}")
+        return None
+
+
+def _match(text: str, pattern: re.Pattern, tables: dict) -> Optional[datetime]:
+    """Match one layout and locale against a normalized timestamp"""
+    match = pattern.match(text)
+    if not match:
+        return None
+
+    month = tables["months"].get(match.group('month').lower())
+    if not month:
+        return None
+
+    hour = int(match.group('hour'))
+    meridiem = match.group('meridiem')
+    if meridiem:
+        period = tables["meridiems"].get(meridiem.lower())
+        if not period or not 1 <= hour <= 12:
+            return None
+        hour = _to_24_hour(hour, period)
+
+    try:
+        return datetime(
+            int(match.group('year')), month, int(match.group('day')),
+            hour, int(match.group('minute')), int(match.group('second') or 0)
+        )
+    except ValueError:
+        return None
+
+
+def _to_24_hour(hour: int, period: str) -> int:
+    """Convert a 12-hour clock value to 24-hour"""
+    if period == "AM":
+        return 0 if hour == 12 else hour
+    return hour if hour == 12 else hour + 12
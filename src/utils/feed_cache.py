@@ -0,0 +1,93 @@
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from .config import config
+from .json_state import load_json_state
+from .pending_state import save_json_entries
+
+logger = logging.getLogger(__name__)
+
+FEED_CACHE_FILE_NAME = "feed_cache.json"
+
+
+class FeedCache:
+    """
+    HTTP validators and item fingerprints of polled feeds.
+
+    Each feed URL keeps the ETag and Last-Modified of its last successful
+    response, sent back as If-None-Match / If-Modified-Since so an unchanged
+    feed costs a 304 with no body. Items are keyed by guid and record a hash
+    of their raw content, so items that did not change since they were last
+    processed can be skipped without parsing their HTML.
+
+    Within a pipeline run, save(run_id) stages the changed feeds, and the
+    storage step commits them once the run's articles are stored.
+    """
+
+    def __init__(self, cache_path: Optional[str] = None):
+        self.path = Path(cache_path or Path(config.cache_dir) / FEED_CACHE_FILE_NAME)
+        self._feeds = load_json_state(self.path, {})
+        self._updated = set()
+
+    def conditional_headers(self, feed_url: str) -> Dict[str, str]:
+        """Return the request headers that make a fetch of feed_url conditional."""
+        feed = self._feeds.get(feed_url, {})
+        headers = {}
+        if feed.get('etag'):
+            headers['If-None-Match'] = feed['etag']
+        if feed.get('last_modified'):
+            headers['If-Modified-Since'] = feed['last_modified']
+        return headers
+
+    def record_validators(self, feed_url: str, response_headers):
+        """Remember the validators of a full (200) response for feed_url."""
+        feed = self._feeds.setdefault(feed_url, {})
+        feed['etag'] = response_headers.get('ETag')
+        feed['last_modified'] = response_headers.get('Last-Modified')
+        self._updated.add(feed_url)
+
+    def is_item_unchanged(self, feed_url: str, guid: str, digest: Optional[str]) -> bool:
+        """
+        Return True if the item was processed before with the same content.
+        An item without a digest (e.g. a sitemap URL without lastmod) is
+        always treated as changed.
+        """
+        return digest is not None and self._feeds.get(feed_url, {}).get('items', {}).get(guid) == digest
+
+    def record_item(self, feed_url: str, guid: str, digest: Optional[str]):
+        """Mark an item as processed in its current state; items without a digest are not recorded."""
+        if digest is None:
+            return
+        self._feeds.setdefault(feed_url, {}).setdefault('items', {})[guid] = digest
+        self._updated.add(feed_url)
+
+    def retain_items(self, feed_url: str, guids: Iterable[str]):
+        """Forget fingerprints of items that are no longer listed in the feed."""
+        items = self._feeds.get(feed_url, {}).get('items')
+        if not items:
+            return
+        guids = set(guids)
+        for guid in [guid for guid in items if guid not in guids]:
+            del items[guid]
+            self._updated.add(feed_url)
+
+    def save(self, run_id: str = ""):
+        """Persist feeds changed by this instance; see save_json_entries."""
+        if not self._updated:
+            return
+
+        merged = save_json_entries(self.path, {url: self._feeds[url] for url in self._updated}, run_id)
+        if merged is not None:
+            self._feeds = merged
+        self._updated.clear()
+
+
+def item_digest(*parts: Optional[str]) -> str:
+    """Hash the raw fields of a feed item."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update((part or '').encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
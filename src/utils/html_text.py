@@ -0,0 +1,29 @@
+from itertools import islice
+from typing import Optional
+
+from lxml import etree
+
+# Recovering libxml2 HTML parser, shared: parsing never mutates it
+_HTML_PARSER = etree.HTMLParser(recover=True, no_network=True, remove_comments=True)
+
+
+def html_to_text(markup: Optional[str], tag: str = 'p', limit: Optional[int] = None, separator: str = ' ') -> str:
+    """
+    Extract the text of the first `limit` `tag` elements of an HTML fragment.
+
+    The fragment is parsed once by libxml2 and read without modifying it.
+    Each element's text nodes are stripped and concatenated, like
+    BeautifulSoup's get_text(strip=True), so images and other empty elements
+    contribute nothing and need no removal.
+    """
+    if not markup or not markup.strip():
+        return ""
+
+    root = etree.fromstring(markup, _HTML_PARSER)
+    if root is None:
+        return ""
+
+    return separator.join(
+        ''.join(text.strip() for text in element.itertext())
+        for element in islice(root.iter(tag), limit)
+    )
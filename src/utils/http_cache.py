@@ -0,0 +1,239 @@
+import io
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+import requests
+from requests.models import PreparedRequest
+from requests.structures import CaseInsensitiveDict
+
+from .config import config
+
+logger = logging.getLogger(__name__)
+
+HTTP_CACHE_DIR_NAME = "http"
+
+# Cache modes: "off", "on" (fresh entries served, stale ones revalidated) and
+# "replay" (served only from the cache, misses never reach the network)
+CACHE_MODES = ("off", "on", "replay")
+
+# Headers describing the transfer rather than the stored (decoded) body
+_TRANSFER_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'keep-alive'}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+CREATE INDEX IF NOT EXISTS entries_digest ON entries (digest);
+"""
+
+
+class CachedResponse(NamedTuple):
+    key: str
+    url: str
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    stored_at: float
+    fresh: bool
+
+
+class _BodyStream(io.BytesIO):
+    """Stands in for urllib3's raw stream, so stream=True callers can read cached bodies."""
+    decode_content = True
+
+
+class HttpCache:
+    """
+    On-disk cache of HTTP GET responses.
+
+    Bodies are zlib-compressed and stored once per SHA-256 of their content
+    under CACHE_DIR/http/objects, so identical pages share one file; a SQLite
+    index maps each request URL to its status, headers and body. Entries
+    younger than ttl_seconds are served without a request. Older ones are
+    revalidated with their ETag / Last-Modified, and a 304 refreshes them.
+    When the stored bodies exceed max_bytes the least recently used entries
+    are evicted. Safe to use from several threads.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        ttl_seconds: float = 3600,
+        max_bytes: int = 512 * 1024 * 1024,
+        replay: bool = False
+    ):
+        self.root = Path(cache_dir or Path(config.cache_dir) / HTTP_CACHE_DIR_NAME)
+        self.objects = self.root / "objects"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.replay = replay
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.root / "index.sqlite"), check_same_thread=False, isolation_level=None)
+        self._db.executescript(_SCHEMA)
+        self._total_bytes = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT MAX(size) AS size FROM entries GROUP BY digest)"
+        ).fetchone()[0]
+
+    @staticmethod
+    def key(method: str, url: str, params=None) -> str:
+        """Cache key of a request: its method and full URL, query parameters included."""
+        prepared = PreparedRequest()
+        prepared.prepare_url(url, params)
+        return f"{method.upper()} {prepared.url}"
+
+    def lookup(self, key: str) -> Optional[CachedResponse]:
+        """Return the cached response for key, or None on a miss."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, status, headers, digest, size, stored_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            url, status, headers, digest, size, stored_at = row
+            try:
+                body = zlib.decompress(self._object_path(digest).read_bytes())
+            except (OSError, zlib.error):
+                # Object lost or corrupted: forget it and every entry sharing
+                # it, so they are fetched again
+                self._drop_object(digest, size)
+                return None
+            self._db.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+
+        return CachedResponse(
+            key, url, status, json.loads(headers), body, stored_at,
+            fresh=time.time() - stored_at < self.ttl_seconds
+        )
+
+    def store(self, key: str, response: requests.Response) -> bytes:
+        """Store a response (reading its body) and return the body."""
+        body = response.content
+        digest = hashlib.sha256(body).hexdigest()
+        headers = {name: value for name, value in response.headers.items() if name.lower() not in _TRANSFER_HEADERS}
+        now = time.time()
+
+        with self._lock:
+            object_path = self._object_path(digest)
+            if object_path.exists():
+                size = object_path.stat().st_size
+            else:
+                data = zlib.compress(body)
+                object_path.parent.mkdir(exist_ok=True)
+                tmp_path = object_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+                tmp_path.write_bytes(data)
+                os.replace(tmp_path, object_path)
+                size = len(data)
+                self._total_bytes += size
+
+            previous = self._db.execute("SELECT digest FROM entries WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, response.url, response.status_code, json.dumps(headers), digest, size, now, now)
+            )
+            if previous and previous[0] != digest:
+                self._release_object(previous[0])
+            self._evict()
+        return body
+
+    def refresh(self, key: str, response_headers=None):
+        """Mark an entry as fresh again after the origin answered 304 Not Modified."""
+        with self._lock:
+            row = self._db.execute("SELECT headers FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return
+            headers = json.loads(row[0])
+            # A 304 may carry updated validators
+            for name in ('ETag', 'Last-Modified'):
+                if response_headers and response_headers.get(name):
+                    headers[name] = response_headers[name]
+            now = time.time()
+            self._db.execute(
+                "UPDATE entries SET stored_at = ?, accessed_at = ?, headers = ? WHERE key = ?",
+                (now, now, json.dumps(headers), key)
+            )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / digest[2:]
+
+    def _release_object(self, digest: str):
+        """Delete a body no entry refers to any more."""
+        if self._db.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)).fetchone():
+            return
+        object_path = self._object_path(digest)
+        try:
+            self._total_bytes -= object_path.stat().st_size
+            object_path.unlink()
+        except OSError:
+            pass
+
+    def _drop_object(self, digest: str, size: int):
+        """Delete an unreadable body and the entries referring to it."""
+        self._db.execute("DELETE FROM entries WHERE digest = ?", (digest,))
+        self._total_bytes -= size
+        try:
+            self._object_path(digest).unlink()
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Drop least recently used entries until the stored bodies fit in max_bytes."""
+        if self._total_bytes <= self.max_bytes:
+            return
+        evicted = 0
+        for key, digest in self._db.execute("SELECT key, digest FROM entries ORDER BY accessed_at").fetchall():
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._release_object(digest)
+            evicted += 1
+        logger.info(f"Evicted {evicted} HTTP cache entries, {self._total_bytes / 1024 / 1024:.1f} MB kept")
+
+
+def cached_response(entry: CachedResponse) -> requests.Response:
+    """Rebuild a requests Response from a cache entry."""
+    response = requests.Response()
+    response.status_code = entry.status
+    response.reason = "OK"
+    response.headers = CaseInsensitiveDict(entry.headers)
+    response.url = entry.url
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response._content = entry.body
+    response.raw = _BodyStream(entry.body)
+    return response
+
+
+def replay_miss_response(url: str) -> requests.Response:
+    """504 answered for requests missing from the cache in replay mode, like Cache-Control: only-if-cached."""
+    response = requests.Response()
+    response.status_code = 504
+    response.reason = "Not in HTTP cache (replay mode)"
+    response.url = url
+    response._content = b""
+    response.raw = _BodyStream(b"")
+    return response
+
+
+def body_stream(body: bytes) -> io.BytesIO:
+    """A raw stream over an already read body, for stream=True callers."""
+    return _BodyStream(body)
@@ -0,0 +1,245 @@
+import time
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import config
+from .http_cache import CACHE_MODES, HttpCache, body_stream, cached_response, replay_miss_response
+
+logger = logging.getLogger(__name__)
+
+# Headers to mimic a real browser
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Connection': 'keep-alive',
+}
+
+# Responses retried; the throttling ones also slow the host down
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+THROTTLE_STATUS_CODES = {429, 503}
+
+# A host is never slowed below this rate, nor made to wait longer than this for Retry-After
+MIN_HOST_RATE = 0.1
+MAX_RETRY_AFTER_SECONDS = 300.0
+
+# Share of the configured rate a host regains after each successful response
+RATE_RECOVERY_STEP = 0.1
+
+DEFAULT_TIMEOUT_SECONDS = 30
+
+
+class _HostBucket:
+    """
+    Token bucket of one host. The rate is halved on throttling responses and
+    recovers additively on success (AIMD), never exceeding the configured rate.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def reserve(self) -> float:
+        """Take a token and return how long to wait before using it."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(wait, self.blocked_until - now)
+
+    def throttled(self, delay: float):
+        self.rate = max(MIN_HOST_RATE, self.rate / 2)
+        self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+
+    def succeeded(self):
+        self.rate = min(self.max_rate, self.rate + self.max_rate * RATE_RECOVERY_STEP)
+
+
+class HttpScheduler:
+    """
+    Request scheduler shared by the HTTP scrapers.
+
+    Requests go through one pooled keep-alive session. Each host has its own
+    token bucket (requests_per_second with bursts of `burst`), and at most
+    max_concurrency requests are in flight across all hosts. Throttling
+    (429/503), server errors and connection failures are retried with
+    exponential backoff from backoff_seconds, or after the server's
+    Retry-After; throttling also halves the host's rate until it recovers.
+    With an HttpCache, GET requests are answered from it when fresh (always,
+    in replay mode) and revalidated with their validators when stale.
+    Safe to use from several threads.
+    """
+
+    def __init__(
+        self,
+        requests_per_second: float = 4.0,
+        burst: int = 4,
+        max_concurrency: int = 8,
+        retries: int = 3,
+        backoff_seconds: float = 1.0,
+        headers: Optional[Dict[str, str]] = None,
+        cache: Optional[HttpCache] = None
+    ):
+        self.requests_per_second = max(requests_per_second, MIN_HOST_RATE)
+        self.burst = max(1, burst)
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.cache = cache
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrency))
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, _HostBucket] = {}
+
+        self.session = requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=max(1, max_concurrency))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def request(self, method: str, url: str, retries: Optional[int] = None, **kwargs) -> requests.Response:
+        """
+        Send a request once the host's bucket and the global cap allow it.
+
+        The last response is returned even when it is an error, so callers
+        keep using raise_for_status(); only connection errors raise, once
+        retries are exhausted.
+        """
+        if self.cache is None or method.upper() != 'GET':
+            return self._send(method, url, retries, **kwargs)
+
+        key = self.cache.key(method, url, kwargs.get('params'))
+        entry = self.cache.lookup(key)
+        if entry and (entry.fresh or self.cache.replay):
+            return cached_response(entry)
+        if self.cache.replay:
+            logger.warning(f"{key} is not in the HTTP cache (replay mode)")
+            return replay_miss_response(url)
+
+        # Callers sending their own validators (e.g. the feed cache) get the origin's 304 as is
+        headers = dict(kwargs.pop('headers', None) or {})
+        caller_validates = any(name in headers for name in ('If-None-Match', 'If-Modified-Since'))
+        if entry and not caller_validates:
+            if entry.headers.get('ETag'):
+                headers['If-None-Match'] = entry.headers['ETag']
+            if entry.headers.get('Last-Modified'):
+                headers['If-Modified-Since'] = entry.headers['Last-Modified']
+
+        response = self._send(method, url, retries, headers=headers, **kwargs)
+        if response.status_code == 304 and entry and not caller_validates:
+            response.close()
+            self.cache.refresh(key, response.headers)
+            return cached_response(entry)
+        if response.status_code == 200:
+            body = self.cache.store(key, response)
+            if kwargs.get('stream'):
+                response.raw = body_stream(body)
+        return response
+
+    def _send(self, method: str, url: str, retries: Optional[int] = None, **kwargs) -> requests.Response:
+        retries = self.retries if retries is None else retries
+        kwargs.setdefault('timeout', DEFAULT_TIMEOUT_SECONDS)
+        host = urlparse(url).netloc
+
+        for attempt in range(retries + 1):
+            self._wait_for_host(host)
+            try:
+                with self._slots:
+                    response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == retries:
+                    raise
+                delay = self.backoff_seconds * 2 ** attempt
+                logger.warning(f"Retrying {url} in {delay:.1f}s after {type(e).__name__}")
+                time.sleep(delay)
+                continue
+
+            if response.status_code not in RETRY_STATUS_CODES or attempt == retries:
+                if response.status_code < 400:
+                    with self._lock:
+                        self._bucket(host).succeeded()
+                return response
+
+            delay = _retry_after(response) or self.backoff_seconds * 2 ** attempt
+            response.close()
+            if response.status_code in THROTTLE_STATUS_CODES:
+                with self._lock:
+                    bucket = self._bucket(host)
+                    bucket.throttled(delay)
+                logger.warning(f"{host} answered {response.status_code}, slowing to {bucket.rate:.2f} req/s and retrying in {delay:.1f}s")
+            else:
+                time.sleep(delay)
+
+        return response
+
+    def close(self):
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+    def _bucket(self, host: str) -> _HostBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = _HostBucket(self.requests_per_second, self.burst)
+        return bucket
+
+    def _wait_for_host(self, host: str):
+        with self._lock:
+            wait = self._bucket(host).reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+
+def _retry_after(response: requests.Response) -> Optional[float]:
+    """Seconds asked for by a Retry-After header (delay or HTTP date), capped."""
+    value = response.headers.get('Retry-After', '').strip()
+    if not value:
+        return None
+    if value.isdigit():
+        return min(float(value), MAX_RETRY_AFTER_SECONDS)
+    try:
+        delay = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+    except (TypeError, ValueError):
+        return None
+    return min(max(delay, 0.0), MAX_RETRY_AFTER_SECONDS)
+
+
+_default_scheduler: Optional[HttpScheduler] = None
+_default_lock = threading.Lock()
+
+
+def default_scheduler() -> HttpScheduler:
+    """The process-wide scheduler configured from config, so every scraper shares its limits."""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            cache = None
+            if config.http_cache_mode not in CACHE_MODES:
+                raise ValueError(f"HTTP_CACHE_MODE must be one of {', '.join(CACHE_MODES)}, got {config.http_cache_mode!r}")
+            if config.http_cache_mode != "off":
+                cache = HttpCache(
+                    ttl_seconds=config.http_cache_ttl_seconds,
+                    max_bytes=config.http_cache_max_mb * 1024 * 1024,
+                    replay=config.http_cache_mode == "replay"
+                )
+            _default_scheduler = HttpScheduler(
+                requests_per_second=config.http_requests_per_second,
+                burst=config.http_burst,
+                max_concurrency=config.http_max_concurrency,
+                retries=config.http_retries,
+                backoff_seconds=config.scraping_delay_seconds,
+                cache=cache
+            )
+        return _default_scheduler
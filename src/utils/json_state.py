@@ -0,0 +1,38 @@
+import os
+import json
+import logging
+import tempfile
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+def load_json_state(path: Path, default: Any) -> Any:
+    """Load a JSON state file, returning default when it is missing or unreadable."""
+    path = Path(path)
+    if not path.exists():
+        return default
+    
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable state file {path}: {str(e)}")
+        return default
+
+
+def save_json_state(path: Path, data: Any):
+    """Atomically write a JSON state file, creating its directory if needed."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    
+    # Write to a temporary file first so an interrupted run never leaves a truncated file
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
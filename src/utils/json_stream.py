@@ -0,0 +1,111 @@
+import json
+from typing import Any, Iterator, Optional, TextIO
+
+# Characters read from the stream at a time
+JSON_CHUNK_SIZE = 256 * 1024
+
+_WHITESPACE = ' \t\n\r'
+_NUMBER_CHARS = '0123456789+-.eE'
+
+
+def iter_json_array(
+    stream: TextIO,
+    array_key: Optional[str] = None,
+    chunk_size: int = JSON_CHUNK_SIZE
+) -> Iterator[Any]:
+    """
+    Yield the elements of a JSON array from a text stream one at a time.
+
+    Anything before the array is skipped: by default the array is the first
+    '[' in the stream, which covers plain JSON arrays, objects wrapping a
+    single array and JavaScript assignments such as
+    `window.YTD.tweets.part0 = [...]`. With array_key, the array is the one
+    following the first occurrence of that quoted key. Only the current
+    element and one chunk are held in memory.
+    """
+    decoder = json.JSONDecoder()
+    reader = _ChunkReader(stream, chunk_size)
+
+    marker = f'"{array_key}"' if array_key else None
+    if marker and not reader.skip_past(marker):
+        return
+    if not reader.skip_past('['):
+        return
+
+    while True:
+        char = reader.next_significant()
+        if char is None:
+            raise ValueError("Unexpected end of stream inside JSON array")
+        if char == ']':
+            return
+        if char == ',':
+            reader.pos += 1
+            continue
+
+        while True:
+            try:
+                value, end = decoder.raw_decode(reader.buffer, reader.pos)
+            except json.JSONDecodeError:
+                if not reader.fill():
+                    raise
+                continue
+            # A number running up to the buffer end (e.g. "1.5e") may be cut short
+            if _is_number(value) and reader.runs_to_end(end, _NUMBER_CHARS) and reader.fill():
+                continue
+            break
+
+        reader.pos = end
+        yield value
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class _ChunkReader:
+    """Sliding text buffer over a stream, trimmed as elements are consumed."""
+
+    def __init__(self, stream: TextIO, chunk_size: int):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Append the next chunk, dropping consumed text. Returns False at end of stream."""
+        if self.eof:
+            return False
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def runs_to_end(self, start: int, chars: str) -> bool:
+        """Check whether the buffer from start onwards consists only of chars."""
+        return all(char in chars for char in self.buffer[start:])
+
+    def skip_past(self, token: str) -> bool:
+        """Advance to just after the next occurrence of token."""
+        while True:
+            index = self.buffer.find(token, self.pos)
+            if index >= 0:
+                self.pos = index + len(token)
+                return True
+            # Keep a tail in case the token straddles two chunks
+            self.pos = max(self.pos, len(self.buffer) - len(token) + 1)
+            if not self.fill():
+                return False
+
+    def next_significant(self) -> Optional[str]:
+        """Skip whitespace and return the next character without consuming it."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return None
@@ -0,0 +1,80 @@
+import shutil
+import hashlib
+import logging
+from pathlib import Path
+from typing import Optional
+
+from .config import config
+from .json_state import load_json_state, save_json_state
+
+logger = logging.getLogger(__name__)
+
+PENDING_DIR_NAME = "pending"
+
+
+def save_json_entries(path: Path, entries: dict, run_id: str = "") -> Optional[dict]:
+    """
+    Merge changed top-level entries into a JSON state file (export manifest,
+    feed cache), keeping entries written by other steps. With a run_id they
+    are staged until the run's articles are stored instead.
+    Returns the merged file contents, or None when the entries were staged.
+    """
+    if run_id:
+        stage_json_state(path, entries, run_id)
+        logger.info(f"Staged {len(entries)} entries of {path} until the articles are stored")
+        return None
+    
+    merged = _merge_json_state(path, entries)
+    logger.info(f"Saved {len(merged)} entries to {path}")
+    return merged
+
+
+def stage_json_state(path: Path, entries: dict, run_id: str):
+    """
+    Stage top-level entries of a JSON state file (export manifest, feed
+    cache) for a pipeline run instead of writing them. Entries staged
+    earlier in the run for the same file are kept.
+    """
+    staged_path = _run_dir(run_id) / f"{hashlib.sha1(str(path).encode('utf-8')).hexdigest()[:16]}.json"
+    staged = load_json_state(staged_path, {"path": str(path), "entries": {}})
+    staged["entries"].update(entries)
+    save_json_state(staged_path, staged)
+
+
+def commit_pending_state(run_id: str) -> int:
+    """
+    Merge the entries staged by a run into their state files, once its
+    articles are stored. Returns the number of entries committed.
+    """
+    run_dir = _run_dir(run_id)
+    if not run_dir.exists():
+        return 0
+
+    committed = 0
+    for staged_path in sorted(run_dir.glob("*.json")):
+        staged = load_json_state(staged_path, None)
+        if not staged:
+            continue
+        path = Path(staged["path"])
+        _merge_json_state(path, staged["entries"])
+        committed += len(staged["entries"])
+        logger.info(f"Committed {len(staged['entries'])} staged entries to {path}")
+
+    shutil.rmtree(run_dir, ignore_errors=True)
+    return committed
+
+
+def discard_pending_state(run_id: str):
+    """Drop the entries staged by a run whose articles were not all stored."""
+    shutil.rmtree(_run_dir(run_id), ignore_errors=True)
+
+
+def _merge_json_state(path: Path, entries: dict) -> dict:
+    merged = load_json_state(path, {})
+    merged.update(entries)
+    save_json_state(path, merged)
+    return merged
+
+
+def _run_dir(run_id: str) -> Path:
+    return Path(config.cache_dir) / PENDING_DIR_NAME / run_id
@@ -0,0 +1,107 @@
+import os
+import re
+import mmap
+import logging
+from bisect import bisect_left
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .json_state import load_json_state, save_json_state
+
+logger = logging.getLogger(__name__)
+
+# Suffix of the index file written next to each export file
+INDEX_SUFFIX = ".sections.json"
+
+# Opening tag of an activity section in Facebook HTML exports
+SECTION_START_PATTERN = re.compile(rb'<section\b[^>]*\bclass="(?:[^"]*\s)?_a6-g[\s"]')
+
+
+class SectionIndex:
+    """
+    Byte offsets of every activity section in one Facebook export file.
+
+    The offsets are found with a single regex pass over a memory-mapped copy
+    of the file and cached in a `<file>.sections.json` sidecar, which is rebuilt
+    whenever the file's size or mtime changes. Where a run that stopped at
+    max_items resumes is recorded in the export manifest, as a section offset.
+    """
+
+    def __init__(self, file_path: Path, size: int, mtime: float, offsets: List[int]):
+        self.file_path = Path(file_path)
+        self.size = size
+        self.mtime = mtime
+        self.offsets = offsets
+
+    @classmethod
+    def load(cls, file_path: Path) -> "SectionIndex":
+        """Load the cached index for file_path, rebuilding it if the file changed."""
+        file_path = Path(file_path)
+        stat = os.stat(file_path)
+        cached = load_json_state(_index_path(file_path), None)
+
+        if cached and cached.get('size') == stat.st_size and cached.get('mtime') == stat.st_mtime:
+            return cls(file_path, stat.st_size, stat.st_mtime, cached['offsets'])
+
+        index = cls(file_path, stat.st_size, stat.st_mtime, _scan_offsets(file_path))
+        logger.info(f"Indexed {index.count} sections in {file_path.name}")
+        index.save()
+        return index
+
+    @property
+    def count(self) -> int:
+        return len(self.offsets)
+
+    def section_at(self, offset: int) -> int:
+        """Return the number of the first section starting at or after offset."""
+        return bisect_left(self.offsets, offset)
+
+    def offset_of(self, section: int) -> int:
+        """Return the byte offset of a section, or the file size past the last one."""
+        return self.offsets[section] if section < self.count else self.size
+
+    def split(self, parts: int, first_section: int = 0) -> List[Tuple[int, Optional[int]]]:
+        """
+        Split the file from first_section onwards into up to `parts` byte ranges
+        of similar size, each starting on a section boundary. The last range is
+        open-ended.
+        """
+        if first_section >= self.count:
+            return []
+
+        start = self.offsets[first_section]
+        step = (self.size - start) / max(parts, 1)
+        boundaries = [first_section]
+        for part in range(1, parts):
+            section = self.section_at(int(start + part * step))
+            if boundaries[-1] < section < self.count:
+                boundaries.append(section)
+
+        ranges = [(self.offsets[a], self.offsets[b]) for a, b in zip(boundaries, boundaries[1:])]
+        ranges.append((self.offsets[boundaries[-1]], None))
+        return ranges
+
+    def save(self):
+        """Write the index next to the export file; a read-only export just isn't cached."""
+        try:
+            save_json_state(_index_path(self.file_path), {
+                'size': self.size,
+                'mtime': self.mtime,
+                'offsets': self.offsets
+            })
+        except OSError as e:
+            logger.warning(f"Could not save section index for {self.file_path.name}: {str(e)}")
+
+
+def _index_path(file_path: Path) -> Path:
+    return file_path.with_name(file_path.name + INDEX_SUFFIX)
+
+
+def _scan_offsets(file_path: Path) -> List[int]:
+    """Find the offset of every section start tag without reading the file into memory."""
+    if os.path.getsize(file_path) == 0:
+        return []
+
+    with open(file_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return [match.start() for match in SECTION_START_PATTERN.finditer(mapped)]
@@ -0,0 +1,184 @@
+import math
+import sqlite3
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .config import config
+
+logger = logging.getLogger(__name__)
+
+URL_INDEX_DIR_NAME = "url_index"
+
+# Bloom filter sizing: false positive rate, and the smallest capacity allocated
+BLOOM_ERROR_RATE = 0.001
+BLOOM_MIN_CAPACITY = 100_000
+
+# Refreshes re-read this much before the last seen scraped_at, so documents
+# written late (scraped_at is set at scrape time, not at write time) are not missed
+REFRESH_OVERLAP = timedelta(days=1)
+
+# URLs read from MongoDB and inserted into the exact set per transaction
+REFRESH_CHUNK_SIZE = 10_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS state (name TEXT PRIMARY KEY, value);
+"""
+
+
+class _BloomFilter:
+    """Bit array Bloom filter with k positions derived from one hash (double hashing)."""
+
+    def __init__(self, capacity: int, error_rate: float = BLOOM_ERROR_RATE, bits: Optional[bytes] = None):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(bits) if bits and len(bits) == (self.size + 7) // 8 else bytearray((self.size + 7) // 8)
+
+    def _positions(self, url: str):
+        digest = hashlib.blake2b(url.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, url: str):
+        for position in self._positions(url):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, url: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(url))
+
+
+class UrlIndex:
+    """
+    Local index of the URLs stored in one MongoDB collection.
+
+    An exact set of URLs is kept in SQLite under CACHE_DIR/url_index, one file
+    per collection, fronted by a Bloom filter persisted next to it: new URLs
+    are almost always rejected by the filter alone, and the rare positives are
+    confirmed by the exact set, so membership answers never need MongoDB.
+    refresh() catches up with documents written since the last refresh, by
+    their scraped_at, and rebuilds the index when documents were deleted.
+    """
+
+    def __init__(self, connection_string: str, database_name: str, collection_name: str, cache_dir: Optional[str] = None):
+        # The server is part of the name, without exposing credentials in it
+        server = hashlib.sha1(connection_string.encode('utf-8')).hexdigest()[:8]
+        root = Path(cache_dir or Path(config.cache_dir) / URL_INDEX_DIR_NAME)
+        root.mkdir(parents=True, exist_ok=True)
+        self.path = root / f"{database_name}.{collection_name}.{server}.sqlite"
+
+        self._db = sqlite3.connect(str(self.path))
+        self._db.executescript(_SCHEMA)
+        self._count = self._db.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+        self._bloom_changed = False
+        self._bloom = self._load_bloom()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, url: str) -> bool:
+        if url not in self._bloom:
+            return False
+        return self._db.execute("SELECT 1 FROM urls WHERE url = ?", (url,)).fetchone() is not None
+
+    def add(self, urls: Iterable[str]):
+        """Record URLs as stored in the collection."""
+        urls = list(urls)
+        if not urls:
+            return
+        with self._db:
+            before = self._db.total_changes
+            self._db.executemany("INSERT OR IGNORE INTO urls VALUES (?)", ((url,) for url in urls))
+            self._count += self._db.total_changes - before
+        if self._count > self._bloom.capacity:
+            self._bloom = self._build_bloom()
+        else:
+            for url in urls:
+                self._bloom.add(url)
+        self._bloom_changed = True
+
+    def refresh(self, collection):
+        """
+        Add the URLs of documents scraped since the last refresh (all of them
+        on the first one). When the collection holds fewer documents than the
+        index, documents were deleted and the index is rebuilt from scratch.
+        """
+        if self._count > collection.estimated_document_count():
+            logger.info(f"{collection.full_name} shrank below the URL index, rebuilding it")
+            self.clear()
+
+        query = {}
+        refreshed_until = self._get_state("refreshed_until")
+        if refreshed_until:
+            refreshed_until = datetime.fromisoformat(refreshed_until)
+            query = {"scraped_at": {"$gte": refreshed_until - REFRESH_OVERLAP}}
+
+        latest = None
+        read = 0
+        chunk = []
+        for document in collection.find(query, {"url": 1, "scraped_at": 1, "_id": 0}).batch_size(REFRESH_CHUNK_SIZE):
+            if document.get("url"):
+                chunk.append(document["url"])
+            scraped_at = document.get("scraped_at")
+            if isinstance(scraped_at, datetime) and (latest is None or scraped_at > latest):
+                latest = scraped_at
+            if len(chunk) >= REFRESH_CHUNK_SIZE:
+                self.add(chunk)
+                read += len(chunk)
+                chunk = []
+        self.add(chunk)
+        read += len(chunk)
+
+        if latest is not None and (not refreshed_until or latest > refreshed_until):
+            self._set_state("refreshed_until", latest.isoformat())
+        self.save()
+        logger.info(f"URL index of {collection.full_name}: read {read} URLs, {self._count} known")
+
+    def clear(self):
+        with self._db:
+            self._db.execute("DELETE FROM urls")
+            self._db.execute("DELETE FROM state")
+        self._count = 0
+        self._bloom = _BloomFilter(BLOOM_MIN_CAPACITY)
+        self._bloom_changed = True
+
+    def save(self):
+        """Persist the Bloom filter, so the next run does not rebuild it from the exact set."""
+        if not self._bloom_changed:
+            return
+        self._set_state("bloom_capacity", self._bloom.capacity)
+        self._set_state("bloom_count", self._count)
+        self._set_state("bloom", bytes(self._bloom.bits))
+        self._bloom_changed = False
+
+    def close(self):
+        self.save()
+        self._db.close()
+
+    def _load_bloom(self) -> _BloomFilter:
+        capacity = self._get_state("bloom_capacity")
+        bits = self._get_state("bloom")
+        # A filter saved before URLs were added (interrupted run) would miss them
+        if capacity and bits and self._get_state("bloom_count") == self._count <= capacity:
+            return _BloomFilter(capacity, bits=bits)
+        return self._build_bloom()
+
+    def _build_bloom(self) -> _BloomFilter:
+        """Size a new filter for twice the current URLs and fill it from the exact set."""
+        bloom = _BloomFilter(max(BLOOM_MIN_CAPACITY, 2 * self._count))
+        for (url,) in self._db.execute("SELECT url FROM urls"):
+            bloom.add(url)
+        self._bloom_changed = True
+        return bloom
+
+    def _get_state(self, name: str):
+        row = self._db.execute("SELECT value FROM state WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, name: str, value):
+        with self._db:
+            self._db.execute("INSERT OR REPLACE INTO state VALUES (?, ?)", (name, value))
@@ -61,6 +61,55 @@ def test_config():
         print(f"❌ Configuration test failed: {e}")
         return False
 
+def test_npblog_sitemap_without_lastmod():
+    """Test that sitemap posts without <lastmod> are fetched on every run."""
+    try:
+        import tempfile
+        from concurrent.futures import ThreadPoolExecutor
+        from src.utils import config
+        from src.steps.npblog_scraper import _discover_posts, _fetch_discovered_posts
+        
+        base_url = "https://blog.example.com/blog/"
+        pages = {
+            "https://blog.example.com/wp-sitemap.xml": (
+                '<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                '<url><loc>https://blog.example.com/blog/first-post/</loc></url>'
+                '<url><loc>https://blog.example.com/blog/second-post/</loc></url>'
+                '</urlset>'
+            ),
+            "https://blog.example.com/blog/first-post/": '<html><head><meta property="og:title" content="First"></head><body><article><p>One</p></article></body></html>',
+            "https://blog.example.com/blog/second-post/": '<html><head><meta property="og:title" content="Second"></head><body><article><p>Two</p></article></body></html>'
+        }
+        
+        class Response:
+            def __init__(self, url):
+                self.status_code = 200 if url in pages else 404
+                self.content = pages.get(url, '').encode('utf-8')
+            
+            def raise_for_status(self):
+                pass
+        
+        class Scheduler:
+            def get(self, url, **kwargs):
+                return Response(url)
+        
+        with tempfile.TemporaryDirectory() as cache_dir:
+            config.cache_dir = cache_dir
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                source_url, discovered = _discover_posts(Scheduler(), executor, base_url)
+                assert [post.lastmod for post in discovered] == [None, None]
+                
+                # Nothing is recorded for them, so the second run fetches them again
+                for _ in range(2):
+                    articles = _fetch_discovered_posts(Scheduler(), executor, source_url, discovered, 10, force=False)
+                    assert sorted(article.title for article in articles) == ["First", "Second"]
+        
+        print("✅ NP Blog sitemap without lastmod test passed!")
+        return True
+    except Exception as e:
+        print(f"❌ NP Blog sitemap without lastmod test failed: {e}")
+        return False
+
 def main():
     """Run all tests."""
     print("Running setup tests...\n")
@@ -69,6 +118,7 @@ def main():
         ("Import tests", test_imports),
         ("Article model tests", test_article_model), 
         ("Configuration tests", test_config),
+        ("NP Blog sitemap tests", test_npblog_sitemap_without_lastmod),
     ]
     
     passed = 0